@@ -0,0 +1,424 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#-----------------------------------------------------------------------------
+# :author:    Pete R. Jemian
+# :email:     prjemian@gmail.com
+# :copyright: (c) 2014-2019, Pete R. Jemian
+#
+# Distributed under the terms of the Creative Commons Attribution 4.0 International Public License.
+#
+# The full license is in the file LICENSE.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+"""
+Time the reading & conversion of synthetic SPEC data files.
+
+Each workload is a synthetic SPEC data file (written by
+:func:`spec2nexus.synthetic.make_spec_file`).  Each task
+is timed in a new process.  The peak memory of each task is
+measured in one more (untimed) run, also in a new process.
+Results are appended (one JSON document per line) to a results
+file so versions of spec2nexus can be compared.
+
+.. autosummary::
+
+    ~run_benchmarks
+    ~report
+    ~main
+
+EXAMPLE::
+
+    user@host ~$ python -m spec2nexus.benchmark --workloads basic mca
+    user@host ~$ python -m spec2nexus.benchmark --report
+
+"""
+
+from collections import OrderedDict
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:     # not available on Windows
+    resource = None
+
+try:
+    import tracemalloc
+except ImportError:     # python 2
+    tracemalloc = None
+
+from . import synthetic
+
+# time.perf_counter() is new in Python 3.3
+_clock_ = getattr(time, "perf_counter", time.time)
+
+RESULTS_FILE = "spec2nexus-benchmarks.jsonl"
+TASKS = ("open", "interpret", "writer", "extractSpecScan", "gallery")
+WORKLOADS = OrderedDict((
+    # name: parameters of synthetic.make_spec_file()
+    ("basic", dict(scans=200, rows=200, columns=10)),
+    ("wide", dict(
+        scans=100, rows=100, columns=40,
+        positioners=400, unicat=200, uxml=True)),
+    ("mca", dict(scans=20, rows=50, columns=8, mca_channels=1024)),
+    ("mesh", dict(scans=20, rows=2500, columns=8, mesh_every=1)),
+))
+
+
+def _memory_method_():
+    """how the peak memory of a task is measured (None if not known)"""
+    if tracemalloc is not None:
+        return "tracemalloc"
+    if resource is not None:
+        return "ru_maxrss"
+    return None
+
+
+def _peak_memory_():
+    """peak memory (bytes) of this process, None if not known"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return peak             # reported in bytes
+    return peak * 1024          # reported in kB
+
+
+def _run_task_(task, filename, workdir, memory=False):
+    """
+    (in a new process) run one task, return (seconds, peak memory, error)
+
+    Only the task is measured, not the work to prepare for it
+    (such as loading the plugins or reading the file
+    before ``interpret``).
+
+    :param bool memory: measure the peak memory allocated by the
+        task (see :func:`_memory_method_`), not its time:
+        ``tracemalloc`` slows the task
+    """
+    from . import plugin
+    from . import spec
+
+    plugin.get_plugin_manager()     # load the plugins now, not measured
+    error = None
+    t0 = None
+    measured = dict(baseline=None)      # memory in use as the task starts
+
+    def start():
+        """the task starts now, return the time"""
+        if memory:
+            measured["baseline"] = _start_memory_()
+        return _clock_()
+
+    try:
+        if task == "open":
+            t0 = start()
+            spec.SpecDataFile(filename)
+
+        elif task == "interpret":
+            sdf = spec.SpecDataFile(filename)
+            t0 = start()
+            sdf.interpret_all(workers=1)
+
+        elif task == "writer":
+            from . import writer
+            sdf = spec.SpecDataFile(filename)
+            sdf.interpret_all(workers=1)
+            hdf_file = os.path.join(workdir, "benchmark.hdf5")
+            t0 = start()
+            writer.Writer(sdf).save(hdf_file)
+
+        elif task == "extractSpecScan":
+            from . import extractSpecScan
+            sdf = spec.SpecDataFile(filename)
+            numbers = sdf.getScanNumbers()
+            scan = sdf.getScan(numbers[0])
+            sys.argv = [
+                "extractSpecScan", filename,
+                "-s", "%s-%s" % (numbers[0], numbers[-1]),
+                "-c", scan.L[0], scan.L[-1],
+                "--quiet",
+                ]
+            del sdf, scan
+            t0 = start()
+            extractSpecScan.main()
+
+        elif task == "gallery":
+            from . import specplot_gallery
+            plot_dir = os.path.join(workdir, "gallery")
+            shutil.rmtree(plot_dir, ignore_errors=True)
+            os.mkdir(plot_dir)
+            t0 = start()
+            specplot_gallery.PlotSpecFileScans([filename], plotDir=plot_dir)
+
+        else:
+            raise KeyError("unknown benchmark task: " + task)
+        seconds = _clock_() - t0
+    except Exception as exc:
+        seconds = None
+        error = "%s: %s" % (exc.__class__.__name__, str(exc))
+    peak = None
+    if memory:
+        peak = _stop_memory_(measured["baseline"])
+    return seconds, peak, error
+
+
+def _start_memory_():
+    """start measuring the memory a task allocates, return the baseline"""
+    if tracemalloc is not None:
+        tracemalloc.start()
+        return 0
+    # ru_maxrss also counts memory inherited from the parent process
+    # and used by the preparation: report only the growth from here
+    return _peak_memory_()
+
+
+def _stop_memory_(baseline):
+    """stop measuring, return the peak memory (bytes) of the task or None"""
+    if tracemalloc is not None:
+        if not tracemalloc.is_tracing():
+            return None
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+    peak = _peak_memory_()
+    if peak is None or baseline is None:
+        return None
+    return peak - baseline
+
+
+def _in_new_process_(task, filename, workdir, memory=False):
+    """run :func:`_run_task_` in a new process (fresh caches & memory)"""
+    pool = multiprocessing.Pool(processes=1)
+    try:
+        return pool.apply(_run_task_, (task, filename, workdir, memory))
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _version_():
+    from . import __version__
+    return __version__
+
+
+def run_benchmarks(
+        workloads=None,
+        tasks=None,
+        scale=1.0,
+        repeat=1,
+        workdir=None,
+        results=RESULTS_FILE,
+        progress=None):
+    """
+    time the tasks for each workload, return a list of results
+
+    :param [str] workloads: names (keys of :data:`WORKLOADS`),
+        default: all
+    :param [str] tasks: names (items of :data:`TASKS`), default: all
+    :param float scale: multiply the number of scans in each workload
+    :param int repeat: time each task this many times,
+        the shortest time is reported
+    :param str workdir: directory for the synthetic files
+        (default: new temporary directory, removed afterwards)
+    :param str results: append results to this file
+        (``None``: do not write results)
+    :param obj progress: function to call with each result
+    """
+    workloads = workloads or list(WORKLOADS.keys())
+    tasks = tasks or list(TASKS)
+    remove_workdir = workdir is None
+    if remove_workdir:
+        workdir = tempfile.mkdtemp(prefix="spec2nexus-benchmark-")
+    elif not os.path.exists(workdir):
+        os.makedirs(workdir)
+
+    version = _version_()
+    date = datetime.datetime.now().isoformat(" ")
+    records = []
+    try:
+        for name in workloads:
+            parameters = dict(WORKLOADS[name])
+            parameters["scans"] = max(1, int(parameters["scans"] * scale))
+            filename = os.path.join(workdir, name + ".dat")
+            info = synthetic.make_spec_file(filename, **parameters)
+
+            for task in tasks:
+                seconds, peak, error = [], None, None
+                for _ in range(repeat):
+                    t, _m, error = _in_new_process_(task, filename, workdir)
+                    if error is not None:
+                        break
+                    seconds.append(t)
+                if error is None and _memory_method_() is not None:
+                    # one more run, not timed
+                    _t, peak, error = _in_new_process_(
+                        task, filename, workdir, memory=True)
+
+                record = OrderedDict()
+                record["version"] = version
+                record["python"] = platform.python_version()
+                record["platform"] = platform.platform()
+                record["date"] = date
+                record["workload"] = name
+                record["parameters"] = parameters
+                record["task"] = task
+                record["repeat"] = repeat
+                record["bytes"] = info["bytes"]
+                record["scans"] = info["scans"]
+                record["rows"] = info["rows"]
+                record["seconds"] = None
+                record["MB_per_s"] = None
+                record["scans_per_s"] = None
+                record["rows_per_s"] = None
+                record["peak_MB"] = None
+                record["memory_method"] = _memory_method_()
+                record["error"] = error
+                if error is None:
+                    best = max(min(seconds), 1e-9)
+                    record["seconds"] = best
+                    record["MB_per_s"] = info["bytes"] / 1e6 / best
+                    record["scans_per_s"] = info["scans"] / best
+                    record["rows_per_s"] = info["rows"] / best
+                if peak is not None:
+                    record["peak_MB"] = peak / 1e6
+                records.append(record)
+                if progress is not None:
+                    progress(record)
+    finally:
+        if remove_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if results is not None:
+        with open(results, "a") as fp:
+            for record in records:
+                fp.write(json.dumps(record) + "\n")
+    return records
+
+
+def _format_record_(record):
+    """one line of text with the result"""
+    text = "%-8s %-16s" % (record["workload"], record["task"])
+    if record["error"] is not None:
+        return text + "  error: " + record["error"]
+    text += " %9.3f s %9.1f MB/s %10.1f scans/s %12.0f rows/s" % (
+        record["seconds"],
+        record["MB_per_s"],
+        record["scans_per_s"],
+        record["rows_per_s"],
+        )
+    if record["peak_MB"] is not None:
+        text += " %8.1f MB peak" % record["peak_MB"]
+    return text
+
+
+def report(results=RESULTS_FILE):
+    """
+    compare the results (shortest time) of each version, return text
+
+    For each workload and task, show the time of each version
+    (in the order first measured) and its change from
+    the version before it.
+    """
+    table = OrderedDict()
+    with open(results, "r") as fp:
+        for line in fp:
+            if len(line.strip()) == 0:
+                continue
+            record = json.loads(line)
+            if record.get("seconds") is None:
+                continue
+            key = (record["workload"], record["task"])
+            versions = table.setdefault(key, OrderedDict())
+            version = record["version"]
+            versions[version] = min(
+                versions.get(version, record["seconds"]), record["seconds"])
+
+    lines = []
+    for (workload, task), versions in table.items():
+        lines.append("%s  %s" % (workload, task))
+        previous = None
+        for version, seconds in versions.items():
+            text = "  %-32s %9.3f s" % (version, seconds)
+            if previous is not None:
+                text += "  %+7.1f%%" % (100.0 * (seconds - previous) / previous)
+            lines.append(text)
+            previous = seconds
+    return "\n".join(lines)
+
+
+def get_user_parameters():
+    """configure user's command line parameters from sys.argv"""
+    import argparse
+
+    doc = __doc__.strip().splitlines()[0]
+    p = argparse.ArgumentParser(prog="spec2nexus.benchmark", description=doc)
+    p.add_argument(
+        "--workloads",
+        nargs="+",
+        choices=list(WORKLOADS.keys()),
+        help="synthetic SPEC data files to use (default: all)")
+    p.add_argument(
+        "--tasks",
+        nargs="+",
+        choices=list(TASKS),
+        help="tasks to be timed (default: all)")
+    p.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="multiply the number of scans in each workload (default: 1)")
+    p.add_argument(
+        "--repeat",
+        type=int,
+        default=1,
+        help="time each task this many times, report the shortest"
+        " (default: 1)")
+    p.add_argument(
+        "--workdir",
+        default=None,
+        help="directory for the synthetic files"
+        " (default: temporary directory)")
+    p.add_argument(
+        "--results",
+        default=RESULTS_FILE,
+        help="append results to this file (default: %s)" % RESULTS_FILE)
+    p.add_argument(
+        "--report",
+        action="store_true",
+        default=False,
+        help="compare versions in the results file (do not run)")
+    return p.parse_args()
+
+
+def main():
+    args = get_user_parameters()
+    if args.report:
+        print(report(args.results))
+        return
+
+    def progress(record):
+        print(_format_record_(record))
+        sys.stdout.flush()
+
+    print("spec2nexus " + _version_())
+    run_benchmarks(
+        workloads=args.workloads,
+        tasks=args.tasks,
+        scale=args.scale,
+        repeat=args.repeat,
+        workdir=args.workdir,
+        results=args.results,
+        progress=progress)
+
+
+if __name__ == "__main__":
+    main()
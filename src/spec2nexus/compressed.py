@@ -0,0 +1,466 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#-----------------------------------------------------------------------------
+# :author:    Pete R. Jemian
+# :email:     prjemian@gmail.com
+# :copyright: (c) 2014-2019, Pete R. Jemian
+#
+# Distributed under the terms of the Creative Commons Attribution 4.0 International Public License.
+#
+# The full license is in the file LICENSE.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+"""
+Read SPEC data files compressed with gzip, bzip2, or xz.
+
+The compression is recognized from the first bytes of the file
+(not the file name extension).  The content is decompressed as
+it is read, the file is not decompressed on disk.
+
+.. autosummary::
+
+    ~compression_of
+    ~open_binary
+    ~GzipSeekIndex
+
+"""
+
+import base64
+import bisect
+import bz2
+import ctypes
+import ctypes.util
+import gzip
+import zlib
+
+try:
+    import lzma
+except ImportError:     # python 2
+    lzma = None
+
+
+COMPRESSION_MAGIC = (
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bz2"),
+    (b"\xfd7zXZ\x00", "xz"),
+)
+COMPRESSION_SUFFIXES = (".gz", ".bz2", ".xz")     # usual file name extensions
+GZIP_SEEK_SPACING = 1 << 23     # uncompressed bytes between seek points
+GZIP_WBITS = zlib.MAX_WBITS | 16    # zlib: expect a gzip header
+GZIP_TRAILER_BYTES = 8          # CRC-32 and size, after each gzip member
+READ_BYTES = 1 << 16            # compressed bytes read at a time
+WINDOW_BYTES = 1 << 15          # deflate: content before a seek point needed
+Z_OK, Z_STREAM_END, Z_BUF_ERROR = 0, 1, -5      # zlib.h
+Z_NO_FLUSH, Z_BLOCK = 0, 5
+
+
+def compression_of(filename):
+    """
+    name of the compression of a file (``gzip``, ``bz2``, ``xz``) or None
+
+    :param str filename: path/to/file
+    """
+    with open(filename, "rb") as fp:
+        head = fp.read(max(len(magic) for magic, _name in COMPRESSION_MAGIC))
+    for magic, name in COMPRESSION_MAGIC:
+        if head.startswith(magic):
+            return name
+    return None
+
+
+def open_binary(filename, compression=None):
+    """
+    open a file to read its (decompressed) bytes
+
+    :param str filename: path/to/file
+    :param str compression: as reported by :func:`compression_of`
+        (default: None, not compressed)
+    """
+    if compression is None:
+        return open(filename, "rb")
+    if compression == "gzip":
+        return gzip.GzipFile(filename, "rb")
+    if compression == "bz2":
+        return bz2.BZ2File(filename, "rb")
+    if compression == "xz" and lzma is not None:
+        return lzma.LZMAFile(filename, "rb")
+    raise IOError(
+        "cannot decompress (%s): %s" % (compression, str(filename)))
+
+
+class GzipSeekIndex(object):
+    """
+    seek points in a gzip file, to read from (about) anywhere
+
+    A gzip file can only be decompressed from its beginning
+    (or from the start of any of its members).
+    While the file is read once from start to end (with :meth:`reader`),
+    a seek point is kept every ``spacing`` bytes of (uncompressed)
+    content.  Then, :meth:`read` decompresses only from the nearest
+    seek point before the requested content.
+
+    A seek point is either the start of a gzip member (such as in
+    a file written in parts or by ``bgzip``) or the end of a deflate 
+    block within a member, with the last 32 kB of content before it
+    (the *window*, compressed).  Deflate blocks are found with the
+    zlib library (by :mod:`ctypes`, as the ``zran.c`` example of zlib).
+    Both can be saved (see :meth:`saved_points`), such as in the
+    index cache of a SPEC data file, and used by another process
+    (see :meth:`restore_points`).  Without that library, the state of 
+    the decompressor (from :mod:`zlib`) is kept in memory instead
+    (each about 40 kB), which cannot be saved.
+
+    :param str filename: path/to/file.gz
+    :param int spacing: uncompressed bytes between seek points
+        (approximate, default: ``GZIP_SEEK_SPACING``)
+
+    .. autosummary::
+
+        ~read
+        ~reader
+        ~restore_points
+        ~saved_points
+
+    """
+
+    def __init__(self, filename, spacing=None):
+        self.filename = filename
+        self.spacing = spacing or GZIP_SEEK_SPACING
+        self.complete = False   # True when all seek points are known
+        self.offsets = [0]      # uncompressed offset of each seek point
+        # (position, start): start is None (gzip member),
+        # (bits, window) (deflate block), or a decompressor (in memory)
+        self.points = [(0, None)]
+
+    def _decompressor_(self, fp, position, start, record=False):
+        """new decompressor, to decompress from a seek point"""
+        libz = _load_libz_()
+        if start is None:
+            if record and libz is not None:
+                return _Inflater(libz, GZIP_WBITS, stop_at_blocks=True)
+            return _Decompressor(GZIP_WBITS)
+        if isinstance(start, _Decompressor):
+            return start.copy()
+        bits, window = start
+        value = 0
+        if bits > 0:
+            # the first bits are in the byte before
+            fp.seek(position - 1)
+            value = ord(fp.read(1)) >> (8 - bits)
+        return _Inflater(libz, -zlib.MAX_WBITS, window, bits, value)
+
+    def _iter_content_(self, point, record=False):
+        """
+        iterate (offset, bytes) of the content, starting from a seek point
+
+        :param int point: index of the seek point
+        :param bool record: add seek points (while reading the whole file)
+        """
+        offset = self.offsets[point]
+        position, start = self.points[point]
+        history = b""       # last content, the window of a seek point
+        with open(self.filename, "rb") as fp:
+            decompressor = self._decompressor_(fp, position, start, record)
+            fp.seek(position)
+            trailer = 0     # bytes of a gzip member trailer still to skip
+            while True:
+                data = fp.read(READ_BYTES)
+                if len(data) == 0:
+                    break
+                base, position = position, position + len(data)
+                used = 0
+                while used < len(data):
+                    if decompressor is None:
+                        skip = min(trailer, len(data) - used)
+                        used, trailer = used + skip, trailer - skip
+                        # next gzip member (skip any padding)
+                        rest = data[used:].lstrip(b"\x00")
+                        used = len(data) - len(rest)
+                        if len(rest) == 0:
+                            break
+                        if record and offset - self.offsets[-1] >= self.spacing:
+                            self._add_point_(offset, base + used, None)
+                        decompressor = self._decompressor_(
+                            fp, base + used, None, record)
+                    first = used
+                    for content, n, bits in decompressor.inflate(data[first:]):
+                        used = first + n
+                        if len(content) > 0:
+                            yield offset, content
+                            offset += len(content)
+                            if decompressor.stop_at_blocks:
+                                history = (history + content)[-WINDOW_BYTES:]
+                        if (
+                            bits is not None
+                            and record 
+                            and offset - self.offsets[-1] >= self.spacing
+                        ):
+                            self._add_point_(
+                                offset, base + used, (bits, history))
+                    if decompressor.eof:
+                        if decompressor.raw:
+                            trailer = GZIP_TRAILER_BYTES
+                        decompressor = None
+                    else:
+                        used = len(data)
+                if (
+                    record
+                    and isinstance(decompressor, _Decompressor)
+                    and offset - self.offsets[-1] >= self.spacing
+                ):
+                    self._add_point_(offset, position, decompressor.copy())
+        if record:
+            self.complete = True
+
+    def _add_point_(self, offset, position, start):
+        """keep a seek point"""
+        self.offsets.append(offset)
+        self.points.append((position, start))
+
+    def reader(self):
+        """
+        file-like object to read the file from start to end
+
+        Seek points are added while it is read.
+        """
+        return _ContentReader(self._iter_content_(0, not self.complete))
+
+    def read(self, offset, length):
+        """
+        return ``length`` bytes of content, starting at ``offset``
+
+        The seek points are found first, if not known yet.
+        """
+        if not self.complete:
+            for _ in self._iter_content_(0, True):
+                pass
+        point = bisect.bisect_right(self.offsets, offset) - 1
+        pieces, end = [], offset + length
+        for start, content in self._iter_content_(point):
+            if start + len(content) <= offset:
+                continue
+            pieces.append(content[max(0, offset - start):end - start])
+            if start + len(content) >= end:
+                break
+        return b"".join(pieces)
+
+    def saved_points(self):
+        """
+        list of the seek points that can be saved (as JSON) or None
+
+        None until all seek points are known.  Each is 
+        ``[offset, position]`` (start of a gzip member) or
+        ``[offset, position, bits, window]`` (end of a deflate block,
+        window compressed and base64-encoded).
+        """
+        if not self.complete:
+            return None
+        saved = []
+        for offset, (position, start) in zip(self.offsets, self.points):
+            if start is None:
+                saved.append([offset, position])
+            elif not isinstance(start, _Decompressor):
+                bits, window = start
+                window = base64.b64encode(zlib.compress(window))
+                saved.append([offset, position, bits, window.decode("ascii")])
+        return saved
+
+    def restore_points(self, saved):
+        """
+        use seek points from :meth:`saved_points` (of the same file)
+
+        All seek points are known then, the file is not read to 
+        find them again.
+        """
+        libz = _load_libz_()
+        offsets, points = [], []
+        for item in saved:
+            offset, position = int(item[0]), int(item[1])
+            if len(item) == 2:
+                start = None
+            elif libz is None:
+                continue    # cannot start within a gzip member
+            else:
+                window = zlib.decompress(base64.b64decode(item[3]))
+                start = (int(item[2]), window)
+            offsets.append(offset)
+            points.append((position, start))
+        if len(offsets) == 0 or offsets[0] != 0:
+            raise ValueError("no seek point at the start of the file")
+        self.offsets, self.points = offsets, points
+        self.complete = True
+
+
+class _Decompressor(object):
+    """decompressor from :mod:`zlib`, as :class:`_Inflater`"""
+
+    raw = False             # a gzip member, with its header & trailer
+    stop_at_blocks = False
+
+    def __init__(self, wbits=GZIP_WBITS, decompressor=None):
+        self.decompressor = decompressor or zlib.decompressobj(wbits)
+        self.eof = False
+
+    def copy(self):
+        return _Decompressor(decompressor=self.decompressor.copy())
+
+    def inflate(self, data):
+        """iterate (content, bytes of data used, None)"""
+        content = self.decompressor.decompress(data)
+        unused = self.decompressor.unused_data
+        self.eof = len(unused) > 0      # end of the gzip member
+        yield content, len(data) - len(unused), None
+
+
+class _ZStream(ctypes.Structure):
+    """z_stream of the zlib library"""
+
+    _fields_ = [
+        ("next_in", ctypes.c_void_p),
+        ("avail_in", ctypes.c_uint),
+        ("total_in", ctypes.c_ulong),
+        ("next_out", ctypes.c_void_p),
+        ("avail_out", ctypes.c_uint),
+        ("total_out", ctypes.c_ulong),
+        ("msg", ctypes.c_char_p),
+        ("state", ctypes.c_void_p),
+        ("zalloc", ctypes.c_void_p),
+        ("zfree", ctypes.c_void_p),
+        ("opaque", ctypes.c_void_p),
+        ("data_type", ctypes.c_int),
+        ("adler", ctypes.c_ulong),
+        ("reserved", ctypes.c_ulong),
+    ]
+
+
+_libz_ = []     # the zlib library (by ctypes) or None, once found
+
+
+def _load_libz_():
+    """the zlib library (by ctypes) or None if not available"""
+    if len(_libz_) == 0:
+        libz = None
+        try:
+            name = ctypes.util.find_library("z") or ctypes.util.find_library("zlib1")
+            if name is not None:
+                libz = ctypes.CDLL(name)
+                libz.zlibVersion.restype = ctypes.c_char_p
+                stream = ctypes.POINTER(_ZStream)
+                libz.inflateInit2_.argtypes = [
+                    stream, ctypes.c_int, ctypes.c_char_p, ctypes.c_int]
+                libz.inflate.argtypes = [stream, ctypes.c_int]
+                libz.inflateEnd.argtypes = [stream]
+                libz.inflatePrime.argtypes = [stream, ctypes.c_int, ctypes.c_int]
+                libz.inflateSetDictionary.argtypes = [
+                    stream, ctypes.c_char_p, ctypes.c_uint]
+        except (OSError, AttributeError):
+            libz = None     # as if not found
+        _libz_.append(libz)
+    return _libz_[0]
+
+
+class _Inflater(object):
+    """
+    decompressor from the zlib library (by ctypes)
+
+    Unlike :mod:`zlib`, it can stop at the end of each deflate block 
+    (to find seek points) and start at a deflate block within a
+    gzip member (from a seek point).
+
+    :param obj libz: from :func:`_load_libz_`
+    :param int wbits: as for :func:`zlib.decompressobj`
+    :param bytes window: content before the start (deflate only)
+    :param int bits: bits of the first byte (before the start) to use
+    :param int value: those bits
+    :param bool stop_at_blocks: report the end of each deflate block
+    """
+
+    def __init__(self, libz, wbits, window=None, bits=0, value=0, stop_at_blocks=False):
+        self.libz = libz
+        self.raw = wbits < 0        # deflate only, not a gzip member
+        self.stop_at_blocks = stop_at_blocks
+        self.eof = False
+        self.stream = _ZStream()
+        self.output = ctypes.create_string_buffer(READ_BYTES)
+        self._check_(libz.inflateInit2_(
+            self.stream, wbits, libz.zlibVersion(), ctypes.sizeof(_ZStream)))
+        if bits > 0:
+            self._check_(libz.inflatePrime(self.stream, bits, value))
+        if window is not None:
+            self._check_(libz.inflateSetDictionary(
+                self.stream, window, len(window)))
+
+    def __del__(self):
+        if getattr(self, "stream", None) is not None:
+            self.libz.inflateEnd(self.stream)
+            self.stream = None
+
+    def _check_(self, status):
+        if status not in (Z_OK, Z_STREAM_END, Z_BUF_ERROR):
+            message = self.stream.msg or b"status %d" % status
+            raise zlib.error("inflate: " + message.decode("ascii", "replace"))
+        return status
+
+    def inflate(self, data):
+        """
+        iterate (content, bytes of data used, bits or None)
+
+        bits (0 .. 7, of the last byte used, still to be decompressed)
+        is given at the end of a deflate block, when ``stop_at_blocks``
+        """
+        flush = Z_BLOCK if self.stop_at_blocks else Z_NO_FLUSH
+        source = ctypes.create_string_buffer(data, len(data))
+        stream = self.stream
+        stream.next_in = ctypes.addressof(source)
+        stream.avail_in = len(data)
+        size = len(self.output)
+        while not self.eof and (stream.avail_in > 0 or stream.avail_out == 0):
+            stream.next_out = ctypes.addressof(self.output)
+            stream.avail_out = size
+            status = self._check_(self.libz.inflate(stream, flush))
+            self.eof = status == Z_STREAM_END
+            produced = size - stream.avail_out
+            used = len(data) - stream.avail_in
+            bits = None
+            if stream.data_type & 0xc0 == 0x80 and not self.eof:
+                bits = stream.data_type & 7     # end of a deflate block
+            yield ctypes.string_at(self.output, produced), used, bits
+            if status == Z_BUF_ERROR:
+                break       # needs more data
+
+class _ContentReader(object):
+    """minimal binary file object over an iterator of (offset, bytes)"""
+
+    def __init__(self, content):
+        self.content = content
+        self.buffer = b""
+        self.position = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.content.close()
+
+    def tell(self):
+        return self.position
+
+    def read(self, size):
+        while len(self.buffer) < size:
+            _offset, data = next(self.content, (None, None))
+            if data is None:
+                break
+            self.buffer += data
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        self.position += len(data)
+        return data
+
+    def seek(self, offset):
+        """move forward to ``offset`` (can not move backward)"""
+        while self.position < offset:
+            if len(self.read(min(offset - self.position, READ_BYTES))) == 0:
+                break
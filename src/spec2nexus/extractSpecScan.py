@@ -115,6 +115,15 @@ def get_user_parameters():
                         help=msg,
                         default=False)
 
+    msg = 'keep a copy of the SPEC data file index in this directory'
+    msg += ' (avoids indexing the file again next time)'
+    parser.add_argument('--index-cache',
+                        action='store',
+                        dest='index_cache',
+                        metavar='DIR',
+                        default=None,
+                        help=msg)
+
     parser.add_argument('spec_file',
                         action='store', 
                         help="SPEC data file name(s)")
@@ -215,15 +224,29 @@ def main():
 
     if cmdArgs.reporting_level in (REPORTING_STANDARD, REPORTING_VERBOSE):
         print("program: " + sys.argv[0])
+    # interpret only what will be reported
+    projection = ['L', 'data']
+    if cmdArgs.G:
+        projection.append('G')
+    if cmdArgs.P:
+        projection.append('positioner')
+    if cmdArgs.Q:
+        projection.append('Q')
+    if cmdArgs.V:
+        projection.append('metadata')
+
     # now open the file and read it
-    specData = spec.SpecDataFile(cmdArgs.spec_file)
+    specData = spec.SpecDataFile(
+        cmdArgs.spec_file, 
+        index_cache=cmdArgs.index_cache,
+        projection=projection)
     if cmdArgs.reporting_level in (REPORTING_STANDARD, REPORTING_VERBOSE):
         print("read: " + cmdArgs.spec_file)
     
     for scanNum in cmdArgs.scan:
         outFile = makeOutputFileName(cmdArgs.spec_file, scanNum)
         scan = specData.getScan(scanNum)
-        scan.interpret()       # force the plug-ins to be processed
+        scan.interpret(projection)     # force the plug-ins to be processed
     
         # get the column numbers corresponding to the column_labels
         column_numbers = []
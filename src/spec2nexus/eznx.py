@@ -27,7 +27,7 @@
 
 .. rubric:: Exceptions raised
 
-* None
+* ValueError: from :func:`storage_options` for an unknown compression
 
 
 .. rubric:: Example
@@ -75,6 +75,11 @@ import numpy
 import six
 
 
+CHUNK_BYTES = 1 << 20       # (at most) bytes in automatic chunks
+COMPRESSION_FILTERS = ("gzip", "lzf")
+STORAGE_MIN_BYTES = 1 << 10     # smaller datasets are not chunked
+
+
 def makeFile(filename, **attr):
     """
     create and open an empty NeXus HDF5 file using h5py
@@ -129,7 +134,132 @@ def openGroup(parent, name, nx_class, **attr):
     return group
 
 
-def makeDataset(parent, name, data = None, **attr):
+def chunk_shape(shape, itemsize, chunk_bytes=CHUNK_BYTES):
+    """
+    choose the chunk shape of a dataset, at most ``chunk_bytes`` each
+
+    The last axes (such as the channels of MCA spectra) are kept
+    whole in a chunk, as far as they fit, then as much as fits of
+    the axis before (split evenly).  So a 1-D column, 2-D spectra
+    (one per row), and 3-D mesh spectra are each read by whole spectra.
+
+    :param (int) shape: shape of the dataset
+    :param int itemsize: bytes in each value
+    :param int chunk_bytes: (at most) bytes in each chunk
+    """
+    room = max(1, chunk_bytes // max(1, itemsize))     # values in a chunk
+    chunks = [1] * len(shape)
+    for axis in reversed(range(len(shape))):
+        length = max(1, shape[axis])
+        if length > room:
+            pieces = -(-length // room)     # as even as possible
+            chunks[axis] = -(-length // pieces)
+            break
+        chunks[axis] = length
+        room //= length
+    return tuple(chunks)
+
+
+def storage_options(chunks=False, compression=None, compression_level=None, shuffle=False):
+    """
+    return the storage options for :func:`makeDataset` (None if default)
+
+    :param bool chunks: write chunked datasets (chunk shape from
+        :func:`chunk_shape`), implied by compression or shuffle
+    :param str compression: compression filter, one of
+        :data:`COMPRESSION_FILTERS` (default: None, not compressed)
+    :param int compression_level: 0 (fast) .. 9 (small) for ``gzip``
+        (default: None, the HDF5 library default)
+    :param bool shuffle: apply the byte shuffle filter (before compression)
+    """
+    if compression not in (None, ) + COMPRESSION_FILTERS:
+        msg = "unknown compression: %s" % str(compression)
+        msg += ", expected one of: " + ", ".join(COMPRESSION_FILTERS)
+        raise ValueError(msg)
+    if compression_level is not None:
+        if compression != "gzip":
+            raise ValueError("compression level is only for gzip compression")
+        if compression_level not in range(10):
+            raise ValueError("gzip compression level must be 0 .. 9")
+    if not (chunks or compression or shuffle):
+        return None
+    storage = dict(chunks=True)
+    if compression is not None:
+        storage["compression"] = compression
+    if compression_level is not None:
+        storage["compression_opts"] = compression_level
+    if shuffle:
+        storage["shuffle"] = True
+    return storage
+
+
+def _encode_strings_(values):
+    """numpy array: text as (variable-length) ASCII bytes, as h5py writes lists"""
+    if values.dtype.kind == "U":
+        try:
+            values = values.astype("S")     # ASCII text
+        except UnicodeEncodeError:
+            values = numpy.char.encode(values, "ascii", "ignore")
+        return values.astype(object)
+    if values.dtype.kind == "S":
+        return values.astype(object)
+    return values
+
+
+def _dataset_values_(data):
+    """
+    values to be written by h5py, strings encoded as ASCII bytes
+
+    Numpy arrays (and other buffers, such as ``array.array``) and
+    lists of numbers, strings, or arrays are converted at once,
+    not value by value.
+    """
+    # storing-a-list-of-strings-to-a-hdf5-dataset-from-python
+    # https://stackoverflow.com/questions/23220513/
+    # [n.encode("ascii", "ignore") for n in data]
+    def encoder(value):
+        if isinstance(value, six.string_types):
+            return value.encode("ascii", "ignore")
+        return value
+
+    if isinstance(data, numpy.ndarray):
+        if data.dtype.kind == "O":
+            return list(map(encoder, data))
+        return _encode_strings_(data)
+
+    if not isinstance(data, (tuple, list)):
+        if isinstance(data, (six.string_types, six.binary_type, bytearray, numpy.generic)):
+            return [encoder(data), ]
+        try:
+            values = numpy.asarray(memoryview(data))
+        except (TypeError, NameError):
+            return [encoder(data), ]
+        if values.ndim == 0:
+            return [encoder(data), ]
+        return values
+
+    try:
+        values = numpy.asarray(data)
+    except ValueError:      # such as: ragged lists
+        return list(map(encoder, data))
+    if values.dtype.kind == "O":
+        return list(map(encoder, data))
+    return _encode_strings_(values)
+
+
+def _create_dataset_(parent, name, values, storage):
+    """create the dataset, chunked & filtered as ``storage`` describes"""
+    if storage is not None:
+        values = numpy.asarray(values)
+        if values.ndim > 0 and values.nbytes >= STORAGE_MIN_BYTES and values.dtype.kind != "O":
+            options = dict(storage)
+            if options.get("chunks") is True:
+                options["chunks"] = chunk_shape(values.shape, values.dtype.itemsize)
+            return parent.create_dataset(name, data=values, **options)
+    return parent.create_dataset(name, data=values)
+
+
+def makeDataset(parent, name, data = None, _storage = None, **attr):
     '''
     create and write data to a dataset in the HDF5 file hierarchy
     
@@ -139,6 +269,10 @@ def makeDataset(parent, name, data = None, **attr):
     :param obj parent: parent group
     :param str name: valid NeXus dataset name
     :param obj data: the information to be written
+    :param dict _storage: chunking & compression, from
+        :func:`storage_options` (default: None, contiguous
+        & not compressed), not used for small datasets
+        (named so it is not taken for an attribute)
     :param dict attr: optional dictionary of attributes
     :return: h5py dataset object
     '''
@@ -146,33 +280,24 @@ def makeDataset(parent, name, data = None, **attr):
         obj = parent.create_dataset(name, data="")
         attr["NOTE"] = "no data supplied, value set to empty string"
     else:
-        # storing-a-list-of-strings-to-a-hdf5-dataset-from-python
-        # https://stackoverflow.com/questions/23220513/
-        # [n.encode("ascii", "ignore") for n in data]
-        def encoder(value):
-            if isinstance(value, six.string_types):
-                return value.encode("ascii", "ignore")
-            return value
-
-        if not isinstance(data, (tuple, list, numpy.ndarray)):
-            data = [data, ]
-        obj = parent.create_dataset(name, data=list(map(encoder, data)))
+        obj = _create_dataset_(parent, name, _dataset_values_(data), _storage)
     addAttributes(obj, **attr)
     return obj
 
-def write_dataset(parent, name, data, **attr):
+def write_dataset(parent, name, data, _storage = None, **attr):
     """write to the NeXus/HDF5 dataset, create it if necessary, return the object
 
     :param obj parent: h5py parent object
     :param str name: valid NeXus dataset name to write
     :param obj data: the information to be written
+    :param dict _storage: chunking & compression (see :func:`makeDataset`)
     :param dict attr: optional dictionary of attributes
     """
     if name in parent:
         # dataset already exists
         # delete it, any links to it may break
         del parent[name]
-    dset = makeDataset(parent, name, data, **attr)
+    dset = makeDataset(parent, name, data, _storage=_storage, **attr)
     return dset
 
 
@@ -16,16 +16,22 @@
 
 # this is the main code for the *spec2nexus* application
 
+from __future__ import print_function
+
 __url__ = 'http://spec2nexus.readthedocs.org/en/latest/spec2nexus.html'
 
 import os
 import sys
+import time
+import traceback
 
 if __name__ == "__main__":
     # put us on the path for developers
     path = os.path.join('..', os.path.dirname(__file__))
     sys.path.insert(0, os.path.abspath(path))
 
+from . import compressed
+from . import eznx
 from . import spec
 from . import writer
 
@@ -51,7 +57,9 @@ def get_user_parameters():
     doc = __doc__.strip().splitlines()[0]
     doc += '\n  URL: ' + __url__
     doc += '\n  v' + version
-    parser = argparse.ArgumentParser(prog='spec2nexus', description=doc)
+    epilog =  'exit status: 0 if all files were converted,'
+    epilog += ' 1 if any file could not be (not found, or an error)'
+    parser = argparse.ArgumentParser(prog='spec2nexus', description=doc, epilog=epilog)
     parser.add_argument('infile', 
                         action='store', 
                         nargs='+', 
@@ -84,6 +92,73 @@ def get_user_parameters():
                         dest='scan_list',
                         default=SCAN_LIST_ALL,
                         help=msg)
+    msg =  'keep a copy of each SPEC data file index in this directory'
+    msg += ' (avoids indexing the file again next time)'
+    parser.add_argument('--index-cache',
+                        action='store',
+                        dest='index_cache',
+                        metavar='DIR',
+                        default=None,
+                        help=msg)
+    msg =  'interpret the scans with N processes'
+    msg += ', default: one at a time'
+    parser.add_argument('--workers',
+                        action='store',
+                        dest='workers',
+                        metavar='N',
+                        type=int,
+                        default=None,
+                        help=msg)
+    msg =  'convert the files with a pool of N processes'
+    msg += ' (an error in one file does not stop the others)'
+    msg += ', default: one at a time'
+    parser.add_argument('-j',
+                        '--jobs',
+                        action='store',
+                        dest='jobs',
+                        metavar='N',
+                        type=int,
+                        default=None,
+                        help=msg)
+    msg =  'update an existing output file: write only new scans'
+    msg += ' and scans changed since (such as the last scan)'
+    parser.add_argument('-u', 
+                        '--update',
+                        action='store_true',
+                        dest='update',
+                        help=msg,
+                        default=False)
+    msg =  'write chunked datasets (chunk shape chosen for each dataset)'
+    msg += ', implied by --compression or --shuffle'
+    parser.add_argument('--chunks',
+                        action='store_true',
+                        dest='chunks',
+                        default=False,
+                        help=msg)
+    msg =  'compress datasets with this filter'
+    msg += ', default: not compressed'
+    parser.add_argument('--compression',
+                        action='store',
+                        dest='compression',
+                        choices=eznx.COMPRESSION_FILTERS,
+                        default=None,
+                        help=msg)
+    msg =  'gzip compression level, 0 (fast) .. 9 (small)'
+    msg += ', default: as chosen by h5py'
+    parser.add_argument('--compression-level',
+                        action='store',
+                        dest='compression_level',
+                        metavar='N',
+                        type=int,
+                        choices=range(10),
+                        default=None,
+                        help=msg)
+    msg =  'apply the byte shuffle filter (improves compression)'
+    parser.add_argument('--shuffle',
+                        action='store_true',
+                        dest='shuffle',
+                        default=False,
+                        help=msg)
 #     parser.add_argument('-t', 
 #                         '--tree-only', 
 #                         action='store_true',
@@ -108,7 +183,15 @@ def get_user_parameters():
                        const=REPORTING_VERBOSE,
                        help=msg)
 
-    return parser.parse_args()
+    args = parser.parse_args()
+    if args.jobs is not None and args.jobs < 1:
+        parser.error('--jobs must be 1 or more')
+    if args.compression_level is not None:
+        if args.compression is None:
+            args.compression = 'gzip'
+        elif args.compression != 'gzip':
+            parser.error('--compression-level is only for gzip compression')
+    return args
 
 
 def parse_scan_list_spec(scan_list_spec):
@@ -153,6 +236,154 @@ def pick_scans(all_scans, opt_scan_list):
     return scan_list
 
 
+def convert_file(spec_data_file_name, user_parms, report=print):
+    """
+    convert one SPEC data file, as described by the command-line options
+    
+    :param str spec_data_file_name: SPEC data file to be converted
+    :param obj user_parms: Namespace from argparse, returned from get_user_parameters()
+    :param obj report: function to call with each line of program output
+    :returns: number of scans written (``None`` if file not found)
+    """
+    if not os.path.exists(spec_data_file_name):
+        msg = 'File not found: ' + spec_data_file_name
+        report(msg)
+        return None
+
+    if user_parms.reporting_level in (REPORTING_STANDARD, REPORTING_VERBOSE):
+        report('reading SPEC data file: '+spec_data_file_name)
+    if user_parms.workers is None:
+        max_interpreted = spec.MAX_INTERPRETED_SCANS
+    else:
+        max_interpreted = None  # all scans are interpreted at once
+    spec_data = spec.SpecDataFile(
+        spec_data_file_name, 
+        index_cache=user_parms.index_cache,
+        max_interpreted=max_interpreted)
+
+    all_scans = spec_data.getScanNumbers()
+    scan_list = list(pick_scans(all_scans, user_parms.scan_list))
+    if user_parms.reporting_level in (REPORTING_VERBOSE):
+        report('  discovered %d scans' % len(spec_data.scans.keys()))
+        report('  converting scan number(s): '  +  ', '.join(map(str, scan_list)))
+
+    basename, ext = os.path.splitext(spec_data_file_name)
+    if ext in compressed.COMPRESSION_SUFFIXES:
+        basename = os.path.splitext(basename)[0]    # data.dat.gz: data
+    nexus_output_file_name = basename + user_parms.hdf5_extension
+    exists = os.path.exists(nexus_output_file_name)
+    out = writer.Writer(
+        spec_data, 
+        chunks=user_parms.chunks, 
+        compression=user_parms.compression, 
+        compression_level=user_parms.compression_level, 
+        shuffle=user_parms.shuffle)
+    if user_parms.update and exists:
+        # scans are interpreted only if written
+        written = out.update(nexus_output_file_name, scan_list)
+        if user_parms.reporting_level in (REPORTING_STANDARD, REPORTING_VERBOSE):
+            msg = 'updated NeXus HDF5 file: ' + nexus_output_file_name
+            msg += ' (%d scan(s) written)' % len(written)
+            report(msg)
+        return len(written)
+    elif user_parms.force_write or not exists:
+        if user_parms.workers is not None:
+            spec_data.interpret_all(
+                workers=user_parms.workers, 
+                scan_list=scan_list)
+        out.save(nexus_output_file_name, scan_list)
+        if user_parms.reporting_level in (REPORTING_STANDARD, REPORTING_VERBOSE):
+            report('wrote NeXus HDF5 file: ' + nexus_output_file_name)
+        return len(scan_list)
+    return 0
+
+
+def _convert_job_(spec_data_file_name, user_parms):
+    """
+    (in a process of the pool) convert one SPEC data file, never raises
+    
+    returns dict with the program output, any error, and the statistics
+    """
+    output = []
+    t0 = time.time()
+    result = dict(file=spec_data_file_name, output=output, error=None, traceback=None, scans=0, bytes=0)
+    try:
+        scans = convert_file(spec_data_file_name, user_parms, report=output.append)
+        if scans is None:
+            result['error'] = 'file not found'
+        else:
+            result['scans'] = scans
+            result['bytes'] = os.path.getsize(spec_data_file_name)
+    except Exception as exc:
+        result['error'] = '%s: %s' % (exc.__class__.__name__, str(exc))
+        result['traceback'] = traceback.format_exc()
+    result['seconds'] = time.time() - t0
+    return result
+
+
+def convert_files(file_names, user_parms, jobs=1):
+    """
+    convert SPEC data files with a pool of ``jobs`` processes, print a summary
+    
+    An error converting one file does not stop the others.
+    The output of each file is printed together, in the order of 
+    ``file_names``, as each is finished.
+    
+    :returns: list of the files that could not be converted
+    """
+    t0 = time.time()
+    if jobs > 1 and len(file_names) > 1:
+        import functools
+        import multiprocessing
+
+        # multiprocessing.Pool (not concurrent.futures): Python 2.7+
+        pool = multiprocessing.Pool(processes=min(jobs, len(file_names)))
+        job = functools.partial(_convert_job_, user_parms=user_parms)
+        results = pool.imap(job, file_names)    # in order of file_names
+    else:
+        pool = None
+        results = (_convert_job_(name, user_parms) for name in file_names)
+
+    total = dict(files=0, scans=0, bytes=0)
+    failures = []
+    reporting = user_parms.reporting_level in (REPORTING_STANDARD, REPORTING_VERBOSE)
+    try:
+        for i, result in enumerate(results, 1):
+            progress = '(%d/%d) %s' % (i, len(file_names), result['file'])
+            if result['error'] is None:
+                total['files'] += 1
+                total['scans'] += result['scans']
+                total['bytes'] += result['bytes']
+                if reporting:
+                    for line in result['output']:
+                        print(line)
+                    print(progress + ': %.2f s' % result['seconds'])
+            else:
+                failures.append(result)
+                print(progress + ': FAILED: ' + result['error'])
+                if result['traceback'] is not None:
+                    sys.stdout.flush()
+                    sys.stderr.write(result['traceback'])
+            sys.stdout.flush()
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    seconds = max(time.time() - t0, 1e-9)
+    if reporting:
+        msg = 'converted %d of %d file(s)' % (total['files'], len(file_names))
+        msg += ', %d scan(s), %.1f MB' % (total['scans'], total['bytes'] / 1e6)
+        msg += ' in %.1f s' % seconds
+        msg += ': %.2f MB/s, %.2f files/s' % (total['bytes'] / 1e6 / seconds, total['files'] / seconds)
+        print(msg)
+    if len(failures) > 0:
+        print('%d file(s) could not be converted:' % len(failures))
+        for result in failures:
+            print('  %s: %s' % (result['file'], result['error']))
+    return [result['file'] for result in failures]
+
+
 def main():
     """entry point for command-line interface"""
 
@@ -166,29 +397,22 @@ def main():
     if not user_parms.hdf5_extension.startswith(os.extsep):
         user_parms.hdf5_extension = os.extsep + user_parms.hdf5_extension
 
-    for spec_data_file_name in spec_data_file_name_list:
-        if not os.path.exists(spec_data_file_name):
-            msg = 'File not found: ' + spec_data_file_name
-            print(msg)
-            continue
-
-        if user_parms.reporting_level in (REPORTING_STANDARD, REPORTING_VERBOSE):
-            print ('reading SPEC data file: '+spec_data_file_name)
-        spec_data = spec.SpecDataFile(spec_data_file_name)
-    
-        all_scans = spec_data.getScanNumbers()
-        scan_list = list(pick_scans(all_scans, user_parms.scan_list))
-        if user_parms.reporting_level in (REPORTING_VERBOSE):
-            print('  discovered %d scans' % len(spec_data.scans.keys()))
-            print('  converting scan number(s): '  +  ', '.join(map(str, scan_list)))
-
-        basename = os.path.splitext(spec_data_file_name)[0]
-        nexus_output_file_name = basename + user_parms.hdf5_extension
-        if user_parms.force_write or not os.path.exists(nexus_output_file_name):
-            out = writer.Writer(spec_data)
-            out.save(nexus_output_file_name, scan_list)
-            if user_parms.reporting_level in (REPORTING_STANDARD, REPORTING_VERBOSE):
-                print('wrote NeXus HDF5 file: ' + nexus_output_file_name)
+    if user_parms.jobs is not None:
+        failures = convert_files(spec_data_file_name_list, user_parms, user_parms.jobs)
+    else:
+        # an error converting one file does not stop the others
+        failures = []
+        for spec_data_file_name in spec_data_file_name_list:
+            try:
+                if convert_file(spec_data_file_name, user_parms) is None:
+                    failures.append(spec_data_file_name)
+            except Exception as exc:
+                print('%s: FAILED: %s: %s' % (spec_data_file_name, exc.__class__.__name__, str(exc)))
+                sys.stdout.flush()
+                traceback.print_exc()
+                failures.append(spec_data_file_name)
+    if len(failures) > 0:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -52,10 +52,13 @@ It is optional to:
 from collections import OrderedDict
 import logging
 import re
+import six
 
 
 logger = logging.getLogger(__name__)
 
+KEY_MEMO_SIZE = 10000       # remember the key for this many words
+
 
 class PluginException(Exception):
     """parent exception for this module"""
@@ -145,6 +148,8 @@ class ControlLineHandler(object):
 
     :param str key: regular expression to match a control line key, up to the first space
     :param [str] scan_attributes_defined: list of scan attributes defined in this class
+    :param [str] requires: keys of other control lines needed by this class
+        (interpreted with it, see :meth:`PluginManager.get_projection_keys`)
     :returns: None
 
     EXAMPLE of ``match_key`` method:
@@ -167,6 +172,7 @@ class ControlLineHandler(object):
     """
     key = None
     scan_attributes_defined = []
+    requires = []
     
     def process(self, text, spec_file_obj, *args, **kws):
         """*required:* handle this line from a SPEC data file"""
@@ -191,6 +197,8 @@ class PluginManager(object):
     .. autosummary::
     
       ~get
+      ~get_handler
+      ~get_projection_keys
       ~getKey
       ~get_registry
       ~get_registry_table
@@ -207,6 +215,13 @@ class PluginManager(object):
             plugin_manager = self
         self.registry = OrderedDict() # dictionary of known ControlLineHandler subclasses
         self.lazy_attributes = []
+        self._handlers_ = {}        # one instance of each handler, reused
+        self._dispatch_ = None      # see _compile_dispatch_()
+        self._dispatch_size_ = 0
+        self._key_memo_ = {}        # first word on line: key
+        self._patterns_ = {}        # compiled regular expression of each key
+        self._projections_ = {}     # projection: keys
+        self._projected_attributes_ = {}    # keys: scan attributes
 
     def load_plugins(self):
         """
@@ -237,8 +252,18 @@ class PluginManager(object):
         if text in self.registry:
             return text
         
-        # brute force search and match using regular expressions
-        return self.match_key(text)
+        # key found for this text before?
+        if self._dispatch_ is None or self._dispatch_size_ != len(self.registry):
+            self._compile_dispatch_()
+        if text in self._key_memo_:
+            return self._key_memo_[text]
+        
+        # search and match using regular expressions
+        key = self.match_key(text)
+        if len(self._key_memo_) >= KEY_MEMO_SIZE:
+            self._key_memo_.clear()
+        self._key_memo_[text] = key
+        return key
 
     def match_key(self, text):
         """
@@ -250,34 +275,191 @@ class PluginManager(object):
         
         Applies a regular expression match using each handler's
         ``key`` as the regular expression to match with ``text``.
+        Handlers are tried in the order they were registered.
+        A handler that defines ``match_key()`` decides for itself.
         """
-        def _match_(text, handler):
-            try:
-                if handler().match_key(text):
-                    return handler.key
-            except AttributeError:
-                # ensure that #X and #XPCS do not both match #X
-                full_pattern = '^' + handler.key + '$'
-                t = re.match(full_pattern, text)
-                # test regexp match to avoid false positives
-                # ensures that beginning and end are different positions
-                return t and t.regs[0][1] != t.regs[0][0]
-
-        for key, handler in self.registry.items():
-            if _match_(text, handler):
-                return key
+        if self._dispatch_ is None or self._dispatch_size_ != len(self.registry):
+            self._compile_dispatch_()
+
+        def _match_(pattern, text):
+            t = pattern.match(text)
+            # test regexp match to avoid false positives
+            # ensures that beginning and end are different positions
+            return t and t.regs[0][1] != t.regs[0][0]
+
+        for combined, keys in self._dispatch_:
+            if combined is None:
+                # handler with its own match_key() method
+                key = keys[0]
+                try:
+                    if self.get_handler(key).match_key(text):
+                        return key
+                except AttributeError:
+                    if _match_(self._patterns_[key], text):
+                        return key
+                continue
+
+            t = combined.match(text)
+            if t is None:
+                continue
+            if t.regs[0][1] != t.regs[0][0]:
+                if len(keys) == 1:
+                    return keys[0]
+                return keys[t.lastindex - 1]    # group of this key
+            # empty match: try each key of this group
+            for key in keys:
+                if _match_(self._patterns_[key], text):
+                    return key
         
         return None
 
+    def _compile_dispatch_(self):
+        """
+        compile the handler keys once, for :meth:`match_key`
+        
+        ``'^' + key + '$'`` is the regular expression for each key.
+        Consecutive handlers without a ``match_key()`` method are 
+        combined into one regular expression (one group per key,
+        tried in order).
+        """
+        self._dispatch_ = []
+        self._dispatch_size_ = len(self.registry)
+        self._key_memo_ = {}
+        self._patterns_ = {}
+        self._projections_ = {}
+        self._projected_attributes_ = {}
+
+        group = []
+        def add_group():
+            if len(group) == 0:
+                return
+            try:
+                combined = re.compile(
+                    "|".join(["(^" + k + "$)" for k in group]))
+            except re.error:
+                # cannot combine these, try one at a time
+                for k in group:
+                    self._dispatch_.append((self._patterns_[k], [k]))
+            else:
+                self._dispatch_.append((combined, list(group)))
+            del group[:]
+
+        for key in self.registry:
+            pattern = re.compile('^' + key + '$')
+            self._patterns_[key] = pattern
+            if hasattr(self.get_handler(key), "match_key"):
+                add_group()
+                self._dispatch_.append((None, [key]))
+            elif pattern.groups > 0:
+                # groups (and back references) would be numbered differently
+                add_group()
+                self._dispatch_.append((pattern, [key]))
+            else:
+                group.append(key)
+        add_group()
+
     def get(self, key):
         """return the handler identified by key or None"""
         return self.registry.get(key)
     
+    def get_handler(self, key):
+        """return the instance of the handler identified by key or None"""
+        handler = self.registry.get(key)
+        if handler is None:
+            return None
+        obj = self._handlers_.get(key)
+        if obj is None or obj.__class__ is not handler:
+            obj = handler()
+            self._handlers_[key] = obj
+        return obj
+    
+    def get_projection_keys(self, projection):
+        """
+        return the set of keys needed to interpret a projection or None
+        
+        :param [str] projection: control line keys (such as ``#L``
+            or ``#G0``) and/or scan attributes (such as ``data``),
+            ``None`` for all of them
+        :returns: set of keys or None (all keys)
+        
+        A scan attribute needs the key of each handler that lists it
+        in ``scan_attributes_defined``.  Each key needs the keys
+        its handler ``requires``.
+        """
+        if projection is None:
+            return None
+        if isinstance(projection, six.string_types):
+            projection = [projection]
+        if self._dispatch_ is None or self._dispatch_size_ != len(self.registry):
+            self._compile_dispatch_()
+        memo = tuple(projection)
+        if memo in self._projections_:
+            return self._projections_[memo]
+
+        keys = set()
+        for item in projection:
+            if item in self.registry:
+                keys.add(item)
+                continue
+            found = [
+                key
+                for key in self.registry
+                if item in self.get_handler(key).scan_attributes_defined
+                ]
+            if len(found) == 0:
+                key = self.match_key(item)
+                if key is None:
+                    raise ValueError(
+                        "unknown control line key or scan attribute: " 
+                        + str(item))
+                found = [key]
+            keys.update(found)
+
+        pending = list(keys)
+        while len(pending) > 0:
+            handler = self.get_handler(pending.pop())
+            for key in getattr(handler, "requires", []):
+                if key not in keys:
+                    keys.add(key)
+                    pending.append(key)
+        keys = frozenset(keys)
+        self._projections_[memo] = keys
+        return keys
+    
+    def get_projection_attributes(self, keys):
+        """
+        return the set of scan attributes fully interpreted by these keys
+        
+        :param keys: set of keys, as from :meth:`get_projection_keys`
+        :returns: set of names from ``lazy_attributes``
+        
+        An attribute is fully interpreted when the key of each handler
+        that lists it in ``scan_attributes_defined`` is in ``keys``.
+        """
+        if self._dispatch_ is None or self._dispatch_size_ != len(self.registry):
+            self._compile_dispatch_()
+        keys = frozenset(keys)
+        if keys in self._projected_attributes_:
+            return self._projected_attributes_[keys]
+
+        attributes = set()
+        for attr in self.lazy_attributes:
+            needed = [
+                key
+                for key in self.registry
+                if attr in self.get_handler(key).scan_attributes_defined
+                ]
+            if keys.issuperset(needed):
+                attributes.add(attr)
+        attributes = frozenset(attributes)
+        self._projected_attributes_[keys] = attributes
+        return attributes
+    
     def process(self, key, *args, **kw):
         """pick the control line handler by key and call its process() method"""
-        handler = self.get(key)
+        handler = self.get_handler(key)
         if handler is not None:
-            handler().process(*args, **kw)
+            handler.process(*args, **kw)
 
     def get_registry(self):
         return self.registry
@@ -328,3 +510,5 @@ class PluginManager(object):
                 self.lazy_attributes.append(att)
     
         self.registry[key] = handler
+        self._handlers_[key] = obj
+        self._dispatch_ = None      # compile again when needed
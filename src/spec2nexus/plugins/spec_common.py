@@ -20,7 +20,14 @@ SPEC data file standard control lines
 """
 
 from collections import OrderedDict
+try:
+    from collections.abc import MutableMapping
+except ImportError:     # python 2
+    from collections import MutableMapping
 import datetime
+import hashlib
+import itertools
+import numpy
 import six
 import time
 
@@ -35,6 +42,147 @@ from ..writer import CONTAINER_CLASS
 
 SCAN_DATA_KEY = 'scan_data'
 
+
+def beginning(buf):
+    "return a string with first few lines of buf"
+    return "\n".join(
+        [
+            line
+            for line in buf.strip().splitlines()[:5]
+            if line.startswith("#")
+        ]
+    )
+
+
+def content_digest(text):
+    "return a digest (str) of the text, to compare scan content"
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+LABEL_SCHEMA_CACHE_SIZE = 1000
+_label_schemas_ = {}
+
+
+class LabelSchema(object):
+    """
+    immutable names of the values in numbered header rows (such as #O)
+
+    Shared by all scans of a header, so that each scan keeps
+    only a vector of values (in the same order as :attr:`names`).
+    Obtain instances from :func:`label_schema`.
+
+    :param rows: tuple of tuples of labels, one tuple for each row
+    """
+
+    __slots__ = ('rows', 'names', 'index')
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.names = tuple(itertools.chain.from_iterable(rows))
+        # same as assigning in a dict: first position, last value wins
+        index = OrderedDict()
+        for i, name in enumerate(self.names):
+            index[name] = i
+        self.index = index
+
+    def __reduce__(self):
+        return label_schema, (self.rows,)
+
+    def fits(self, rows):
+        """True if ``rows`` has one value for each label, row by row"""
+        return (
+            len(rows) == len(self.rows)
+            and all(map(lambda v, r: len(v) == len(r), rows, self.rows))
+        )
+
+
+def label_schema(rows):
+    """
+    return the shared :class:`LabelSchema` for these rows of labels
+
+    :param [[str]] rows: labels such as ``header.O`` or ``header.H``
+    """
+    key = tuple(map(tuple, rows))
+    schema = _label_schemas_.get(key)
+    if schema is None:
+        if len(_label_schemas_) >= LABEL_SCHEMA_CACHE_SIZE:
+            _label_schemas_.clear()
+        schema = _label_schemas_[key] = LabelSchema(key)
+    return schema
+
+
+class LabelledValues(MutableMapping):
+    """
+    ``{label: value}`` view of a value vector, copied when changed
+
+    The labels come from a shared :class:`LabelSchema`, the
+    values are stored in the same order as ``schema.names``.
+    Used like the (ordered) dictionary it replaces (``keys()``,
+    ``values()``, ``items()``, ``get()``, ``update()``, item
+    assignment, ...).  The first change copies the content
+    into a dictionary of its own (the schema is not changed).
+    It is not a ``dict``: use :meth:`copy` (or ``dict(...)``)
+    where one is needed, such as for ``json.dumps()``.
+    """
+
+    __slots__ = ('schema', '_vector', '_dict')
+
+    def __init__(self, schema, values):
+        self.schema = schema
+        self._vector = values
+        self._dict = None       # own copy, once changed
+
+    def _changed_(self):
+        """return the dictionary to change (copy on first change)"""
+        if self._dict is None:
+            self._dict = self.copy()
+            self._vector = None
+        return self._dict
+
+    def copy(self):
+        """return a new ``OrderedDict`` with the same content"""
+        return OrderedDict(self.items())
+
+    def __copy__(self):
+        # copy.copy(): a change to either one does not change the other
+        other = LabelledValues(self.schema, self._vector)
+        if self._dict is not None:
+            other._dict = OrderedDict(self._dict)
+        return other
+
+    def __getitem__(self, label):
+        if self._dict is not None:
+            return self._dict[label]
+        value = self._vector[self.schema.index[label]]
+        if isinstance(value, numpy.floating):
+            value = float(value)
+        return value
+
+    def __setitem__(self, label, value):
+        self._changed_()[label] = value
+
+    def __delitem__(self, label):
+        del self._changed_()[label]
+
+    def __iter__(self):
+        if self._dict is not None:
+            return iter(self._dict)
+        return iter(self.schema.index)
+
+    def __len__(self):
+        if self._dict is not None:
+            return len(self._dict)
+        return len(self.schema.index)
+
+    def __contains__(self, label):
+        if self._dict is not None:
+            return label in self._dict
+        return label in self.schema.index
+
+    def __repr__(self):
+        return repr(self.copy())
+
+
 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
 # header block
@@ -224,6 +372,8 @@ class SPEC_Scan(ControlLineHandler):
     # do NOT add S to scan_attributes_defined
     
     def process(self, part, sdf, *args, **kws):
+        # part is None when sdf is indexed, then block tells where to find it
+        block = kws.get("block")
         if len(sdf.headers) == 0:
             # make a header if none exists now
             raw = ""        # TODO: what default content to use?
@@ -232,40 +382,48 @@ class SPEC_Scan(ControlLineHandler):
         else:
             header = sdf.headers[-1]    # pick the most recent header
 
-        matches = [
-            (k, s) 
-            for k, s in sdf.scans.items()
-            if s.raw.strip() == part.strip()
-            ]
-
-        if len(matches) > 0 and sdf.last_scan is not None:
-            if sdf.getScan(sdf.last_scan).raw != part:
-                return
+        if part is None:
+            # same place in the file: same content
+            digest = block
+            first_line = block.first_line
+        else:
+            digest = content_digest(part.strip())
+            first_line = part.splitlines()[0]
+
+        known = sdf._scan_digests_.get(digest)
+        if known is not None and sdf.scans.get(known.scanNum) is known:
+            # this content has been read before
+            if sdf.last_scan is not None:
+                last_scan = sdf.getScan(sdf.last_scan)
+                if part is None:
+                    if last_scan._block != block:
+                        return
+                elif last_scan.raw != part:
+                    return
 
         scan = SpecDataFileScan(header, part, parent=sdf)
+        scan._block = block
+        if part is not None:
+            scan._prefix_digest_ = content_digest(beginning(part))
         if sdf.last_scan is not None:
             # We know that `part` does not match any existing scan.
             # Do the first few lines match (#S and #D in particular)?
             # If so, then that scan has been updated with more data.
-            def beginning(buf):
-                "return a string with first few lines of buf"
-                return "\n".join(
-                    [
-                        line
-                        for line in buf.strip().splitlines()[:5]
-                        if line.startswith("#")
-                    ]
-                )
-
-            # TODO: replace beginning() with new algorithm
-            # if new_scan.raw.startswith(last_scan.raw), that's it!
-
-            if beginning(part) == beginning(sdf.getScan(sdf.last_scan).raw):
+            last_scan = sdf.getScan(sdf.last_scan)
+            if part is None:
+                updated = last_scan._block is not None \
+                    and last_scan._block.offset == block.offset
+            else:
+                prefix_digest = getattr(last_scan, "_prefix_digest_", None)
+                if prefix_digest is None:
+                    prefix_digest = content_digest(beginning(last_scan.raw))
+                updated = scan._prefix_digest_ == prefix_digest
+            if updated:
                 # remove the last scan
                 del sdf.scans[sdf.last_scan]
                 sdf.last_scan = None
 
-        scan.S = strip_first_word(part.splitlines()[0].strip())
+        scan.S = strip_first_word(first_line.strip())
         scan.scanNum = scan.S.split()[0]
         scan.scanCmd = strip_first_word(scan.S)
         
@@ -287,6 +445,7 @@ class SPEC_Scan(ControlLineHandler):
             msg = str(scan.scanNum) + ' in ' + sdf.fileName
             raise DuplicateSpecScanNumber(msg)
         sdf.scans[scan.scanNum] = scan
+        sdf._scan_digests_[digest] = scan
 
 
 @six.add_metaclass(AutoRegister)
@@ -588,6 +747,7 @@ class SPEC_Labels(ControlLineHandler):
 
     key = '#L'
     scan_attributes_defined = ['L', 'column_first', 'column_last']
+    requires = ['#N']
     
     def process(self, text, scan, *args, **kws):
         # Some folks use more than two spaces!  Use regular expression(re) module
@@ -674,6 +834,8 @@ class SPEC_PositionerNames(ControlLineHandler):
     
     * (SpecDataFileHeader) : **O** : label
     * (SpecDataFileScan): **positioner** : {label: value}
+      (a :class:`LabelledValues` mapping, not a ``dict``,
+      when #P matches #O)
     
     HDF5/NeXus REPRESENTATION
     
@@ -804,6 +966,17 @@ class SPEC_Positioners(ControlLineHandler):
         
         :param SpecDataFileScan scan: data from a single SPEC scan
         """
+        schema = label_schema(scan.header.O)
+        if schema.fits(scan.P):
+            # usual case: store only the values, labels are shared
+            values = itertools.chain.from_iterable(scan.P)
+            scan.positioner = LabelledValues(
+                schema,
+                numpy.fromiter(map(float, values), float, len(schema.names)))
+            if len(scan.positioner) > 0:
+                scan.addH5writer(self.key, self.writer)
+            return
+
         scan.positioner = OrderedDict()
         for row, values in enumerate(scan.P):
             if row >= len(scan.header.O):
@@ -1007,6 +1180,9 @@ class SPEC_DataLine(ControlLineHandler):
     
     * (SpecDataFileScan): **data_lines** : values
     * (SpecDataFileScan): **data** : {labels: values}
+    * (SpecDataFileScan): **data_array** : *numpy.ndarray*
+      of all columns (one row per column), only when
+      the SpecDataFile is *columnar*, otherwise None
     
     HDF5/NeXus REPRESENTATION
     
@@ -1021,7 +1197,8 @@ class SPEC_DataLine(ControlLineHandler):
     # key = r'[+-]?\d*\.?\d?'
     # use custom key match since regexp for floats is tedious!
     key = SCAN_DATA_KEY
-    scan_attributes_defined = ['data', 'data_lines']
+    scan_attributes_defined = ['data', 'data_array', 'data_lines']
+    requires = ['#L', r'@A\d*']
 
     def match_key(self, text):
         """
@@ -1102,6 +1279,8 @@ class SPEC_MCA_Array(ControlLineHandler):
     
     * (SpecDataFileScan): **data_lines** : values
     * (SpecDataFileScan): **data** : {labels: values}
+    * (SpecDataFileScan): **data['_mca_']** : {mca: spectra}, 
+      *numpy.ndarray* (one row per spectrum) for each of @A, @A1, ...
     
     HDF5/NeXus REPRESENTATION
     
@@ -1118,6 +1297,7 @@ class SPEC_MCA_Array(ControlLineHandler):
     # continued lines will be matched by SPEC_DataLine
     # process these lines only after all lines have been read
     scan_attributes_defined = ['data_lines']
+    requires = [SCAN_DATA_KEY]
 
     # TODO: need more examples of MCA spectra in SPEC files to improve this
     # Are there any other MCA spectra (such as @B) possible?
@@ -1360,6 +1540,81 @@ class SPEC_MCA_RegionOfInterest(ControlLineHandler):
 
 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
+def join_continued_lines(lines):
+    """
+    join any line that ends with a backslash with the line after it
+    
+    :param [str] lines: text of each line
+    :returns: list of str
+    """
+    joined = []
+    continued = []
+    for line in lines:
+        if line.endswith('\\'):
+            continued.append(line[:-1])
+            continue
+        continued.append(line)
+        joined.append(' '.join(continued))
+        continued = []
+    if len(continued) > 0:
+        # last line ends with a backslash but nothing follows
+        joined.append(' '.join(continued) + '\\')
+    return joined
+
+
+def mca_spectra_to_array(spectra):
+    """
+    interpret the MCA spectra (one of @A, @A1, ...) of a scan into a 2-D array
+    
+    The array is allocated (sized from the first spectrum)
+    before the values are interpreted.
+    
+    :param [str] spectra: text with the values of each spectrum
+    :returns: *numpy.ndarray* of shape (number of spectra, number of
+        values in the first spectrum), or list of lists if the spectra
+        are not all the same length
+    """
+    if len(spectra) == 0:
+        return numpy.empty((0, 0))
+    first = spectra[0].split()
+    num_channels = len(first)
+    array = numpy.empty((len(spectra), num_channels))
+    for i, text in enumerate(spectra):
+        values = first if i == 0 else text.split()
+        if len(values) != num_channels:
+            return [list(map(float, text.split())) for text in spectra]
+        array[i] = numpy.fromiter(map(float, values), float, num_channels)
+    return array
+
+
+def data_rows_to_array(rows, num_columns):
+    """
+    interpret the numbers in the data rows of a scan, all at once
+    
+    Only complete rows (``num_columns`` numbers) are kept.
+    Incomplete rows and rows that cannot be interpreted are skipped.
+    
+    :param [str] rows: text of each data row
+    :param int num_columns: number of data columns
+    :returns: *numpy.ndarray* of shape (number of rows kept, num_columns)
+    """
+    if num_columns == 0:
+        return numpy.empty((0, 0))
+    words = [row.split() for row in rows]
+    words = [w for w in words if len(w) == num_columns]
+    try:
+        values = list(map(float, itertools.chain.from_iterable(words)))
+    except ValueError:
+        # at least one bad row, look at each row
+        values = []
+        for w in words:
+            try:
+                values.extend([float(v) for v in w])
+            except ValueError as _exc:
+                pass    # ignore bad data lines (could save it as such ...)
+    return numpy.array(values, dtype=float).reshape(-1, num_columns)
+
+
 def data_lines_postprocessing(scan):
     """
     interpret the data lines from the body of the scan
@@ -1376,37 +1631,42 @@ def data_lines_postprocessing(scan):
             scan.L[col] = label     # rename this column's label
         scan.data[label] = []       # list for the column's data
     num_columns = len(scan.data)
-    
-    # gather up any continuation lines
-    dl = '\n'.join(scan.data_lines).replace('\\\n', ' ')
-    if dl.find('@A') > -1:
-        # There can be more than 1 MCA spectrum specified
-        # scan.data[MCA_DATA_KEY] = {}  keys: mca or mca1, mca2, ...
-        scan.data[MCA_DATA_KEY] = {}
 
     # interpret the data lines from the body of the scan
-    for _, values in enumerate(dl.splitlines()):
+    rows = []
+    spectra = OrderedDict()     # text of each MCA spectrum, by key
+    for values in join_continued_lines(scan.data_lines):
+        if values.startswith('@A') and values.endswith('\\'):
+            continue    # last spectrum, SPEC has not finished writing it
         if values.startswith('@A'):
             # which MCA spectrum is THIS one?
-            parts = values.split()
+            parts = values.split(None, 1)
             if parts[0] == '@A':                 # @A: mca
                 key = 'mca'
             else:
                 key = 'mca' + parts[0][2:]       # @A1: mca1, @A2: mca2, ...
-            if key not in scan.data[MCA_DATA_KEY]:
-                scan.data[MCA_DATA_KEY][key] = []
             # accumulate this spectrum
-            mca_spectrum = list(map(float, parts[1:]))
-            scan.data[MCA_DATA_KEY][key].append(mca_spectrum)
+            spectra.setdefault(key, []).append(
+                parts[1] if len(parts) > 1 else '')
         else:
-            try:
-                buf = scan._interpret_data_row(values)
-                if len(buf) == num_columns:
-                    # only keep complete rows
-                    for label, val in buf.items():
-                        scan.data[label].append(val)
-            except ValueError as _exc:
-                pass    # ignore bad data lines (could save it as such ...)
+            rows.append(values)
+    if len(spectra) > 0:
+        # There can be more than 1 MCA spectrum specified
+        # scan.data[MCA_DATA_KEY] = {}  keys: mca or mca1, mca2, ...
+        scan.data[MCA_DATA_KEY] = {
+            key: mca_spectra_to_array(stream)
+            for key, stream in spectra.items()
+            }
+
+    table = data_rows_to_array(rows, num_columns)
+    if getattr(scan.parent, "columnar", False):
+        # scan owns one array, each column is a view (not a copy)
+        scan.data_array = numpy.ascontiguousarray(table.T)
+        for col, label in enumerate(scan.L[:num_columns]):
+            scan.data[label] = scan.data_array[col]
+    else:
+        for col, label in enumerate(scan.L[:num_columns]):
+            scan.data[label] = table[:, col].tolist()
     scan.addH5writer(SCAN_DATA_KEY, data_lines_writer)
 
 
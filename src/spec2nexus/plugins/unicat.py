@@ -19,14 +19,24 @@ in the scans using #H/#V pairs of labels/values.
 """
 
 
+import itertools
 import re
 import six
 
 from .. import eznx
 from ..plugin import AutoRegister, ControlLineHandler
+from .spec_common import label_schema, LabelledValues
 from ..utils import strip_first_word
 
 
+def _number_or_text_(value):
+    "float of the value, the text only if that conversion fails"
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
 @six.add_metaclass(AutoRegister)
 class UNICAT_MetadataMnemonics(ControlLineHandler):
 
@@ -43,6 +53,8 @@ class UNICAT_MetadataMnemonics(ControlLineHandler):
     
     * (SpecDataFileHeader) : **H** : labels
     * (SpecDataFileScan): **metadata** : {labels: values}
+      (a :class:`~spec2nexus.plugins.spec_common.LabelledValues`
+      mapping, not a ``dict``, when #V matches #H)
     
     HDF5/NeXus REPRESENTATION
     
@@ -116,6 +128,14 @@ class UNICAT_MetadataValues(ControlLineHandler):
         if not hasattr(scan.header, "H"):
             msg = "No matching #H line(s) for scan %d" % scan.scanNum
             raise KeyError(msg)
+        schema = label_schema(scan.header.H)
+        if schema.fits(scan.V):
+            # usual case: store only the values, labels are shared
+            scan.metadata = LabelledValues(
+                schema,
+                tuple(map(_number_or_text_, itertools.chain.from_iterable(scan.V))))
+            scan.addH5writer(self.key, self.writer)
+            return
         for row, values in enumerate(scan.V):
             if (row+1) > len(scan.header.H):
                 msg = "No matching #H%d line for #V%d in scan %d" % (row, row, scan.scanNum)
@@ -125,10 +145,7 @@ class UNICAT_MetadataValues(ControlLineHandler):
                     msg = "No matching label in #H%d line for #V%d, column %d in scan %d" % (row, row, col, scan.scanNum)
                     raise KeyError(msg)
                 label = scan.header.H[row][col]
-                try:
-                    scan.metadata[label] = float(val)
-                except ValueError:
-                    scan.metadata[label] = val
+                scan.metadata[label] = _number_or_text_(val)
         scan.addH5writer(self.key, self.writer)
     
     def writer(self, h5parent, writer, scan, nxclass=None, *args, **kws):
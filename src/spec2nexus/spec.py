@@ -31,9 +31,11 @@ to read and interpret the information.
    
     ~is_spec_file
     ~is_spec_file_with_header
+    ~iter_scans
     ~SpecDataFile
     ~SpecDataFileHeader
     ~SpecDataFileScan
+    ~SpecDataFileIndexCache
 
 
 ..  -----------------------------------------------------------------------------------------
@@ -111,6 +113,19 @@ Get plottable data from scan number 10:
     >>> y_data = scan10.data[y_label]
 
 
+Read a (very large) file one scan at a time,
+only the scan in use is kept in memory:
+
+    >>> from spec2nexus import spec
+    >>> for part in spec.iter_scans('path/to/my/spec_data.dat'):
+    ...     if isinstance(part, spec.SpecDataFileScan):
+    ...         print(part.scanNum, len(part.data[part.L[0]]))
+
+Files compressed with gzip, bzip2, or xz are read
+(and decompressed) directly, see :mod:`spec2nexus.compressed`:
+
+    >>> spec_data = spec.SpecDataFile('path/to/my/spec_data.dat.gz')
+
 Try to read a file that does not exist:
 
     >>> spec_data = spec.SpecDataFile('missing_file')
@@ -122,14 +137,61 @@ Try to read a file that does not exist:
 
 """
 
-from collections import OrderedDict
+import bisect
+from collections import namedtuple, OrderedDict
+import codecs
+import contextlib
+import copy
+import hashlib
+import importlib
+import json
+import mmap
+import multiprocessing
 import os
-import time
+import pickle
+import re
+import stat
+import zlib
+from . import compressed
 from . import plugin
 
 
 UNRECOGNIZED_KEY = 'unrecognized_control_line'
 MCA_DATA_KEY = '_mca_'
+BLOCK_KEYS = ("#E", "#F", "#S")
+ENCODING = "utf-8"
+INDEX_CACHE_SUFFIX = ".s2n-index.json"
+INDEX_CACHE_VERSION = 1
+INDEX_PREFIX_BYTES = 65536
+SPEC_FILE_PROBE_BYTES = 1 << 24     # is_spec_file() looks no further for #S
+MAX_INTERPRETED_SCANS = 100     # for programs that use each scan once
+ITER_CHUNK_BYTES = 1 << 20      # read by iter_scans()
+
+# A block starts with #E, #F, or #S as the first word on a line.
+# Lines may end with any of \n, \r\n, or \r.
+# The patterns match only the control word (fast literal search),
+# see _iter_line_starts_() for the test that it begins a line.
+BLOCK_PATTERN = re.compile(br'#([EFS])(?=[ \t\x0b\x0c\r\n]|\Z)')
+DATE_PATTERN = re.compile(br'#D(?=[ \t\r\n]|\Z)')
+EOL_PATTERN = re.compile(br'[\r\n]')
+SCAN_PATTERN = re.compile(br'#S ')
+LEADING_BLANKS = b' \t\x0b\x0c'
+
+
+_spec_files_ = {}   # is_spec_file(): {path: ((size, mtime), answer)}
+
+
+IndexedBlock = namedtuple(
+    "IndexedBlock", "key offset length first_line date_line")
+IndexedBlock.__doc__ = """
+location of one (#F | #E | #S) block in a SPEC data file
+
+:param str key: control line that starts this block
+:param int offset: byte offset of the block's first line
+:param int length: number of bytes in the block
+:param str first_line: text of the block's first line
+:param str date_line: text of first ``#D`` line in a #S block (or None)
+"""
 
 
 class SpecDataFileNotFound(IOError): 
@@ -155,16 +217,61 @@ def is_spec_file(filename):
     :param str filename: path/to/possible/spec/data.file
 
     *filename* is a SPEC file if it contains at least one #S control line
+    (the file may be compressed, see :mod:`spec2nexus.compressed`)
+    
+    Only the start of the file is read, up to its first #S line.
+    The file is not SPEC if that text is binary (not UTF-8 or has
+    a NUL byte) or if there is no #S line in the first
+    ``SPEC_FILE_PROBE_BYTES`` bytes.
+    The answer is remembered (while the size and modification time
+    of the file do not change).
     """
-    if not os.path.exists(filename) or not os.path.isfile(filename):
+    try:
+        st = os.stat(filename)
+    except (OSError, TypeError, ValueError):
         return False
+    if not stat.S_ISREG(st.st_mode):
+        return False
+    key = os.path.abspath(filename)
+    signature = (st.st_size, st.st_mtime)
+    known = _spec_files_.get(key)
+    if known is not None and known[0] == signature:
+        return known[1]
     try:
-        with open(filename, "r") as fp:
-            for line in fp.readlines():
-                if line.startswith("#S "):
-                    return True
+        compression = compressed.compression_of(filename)
+        with compressed.open_binary(filename, compression) as fp:
+            result = _has_scan_(fp)
     except Exception:
-        pass
+        result = False
+    _spec_files_[key] = (signature, result)
+    return result
+
+
+def _has_scan_(fp, limit=None):
+    """
+    does binary stream ``fp`` have a #S line (readable text before it)?
+    
+    The stream is read one part at a time, until the first #S line,
+    binary content, or ``limit`` bytes (default: ``SPEC_FILE_PROBE_BYTES``).
+    """
+    if limit is None:
+        limit = SPEC_FILE_PROBE_BYTES
+    decoder = codecs.getincrementaldecoder(ENCODING)()
+    tail = b""      # end of the previous part, a #S may start there
+    total = 0
+    while total < limit:
+        part = fp.read(min(INDEX_PREFIX_BYTES, limit - total))
+        if len(part) == 0 or b"\x00" in part:
+            return False    # no #S line or binary content
+        total += len(part)
+        buf = tail + part
+        for offset, m in _iter_line_starts_(SCAN_PATTERN, buf, blanks=False):
+            if offset == 0 and len(tail) > 0:
+                continue    # seen before, at the end of the previous part
+            decoder.decode(part[:max(0, offset - len(tail))])
+            return True
+        decoder.decode(part)
+        tail = buf[-3:]
     return False
 
 
@@ -195,7 +302,13 @@ def is_spec_file_with_header(filename):
         return False
     expected_controls = ('#F ', '#E ', '#D ', '#C ')
     try:
-        lines = open(filename).readlines()[:len(expected_controls)]
+        # only the start of the file is needed
+        compression = compressed.compression_of(filename)
+        with compressed.open_binary(filename, compression) as fp:
+            head = fp.read(INDEX_PREFIX_BYTES)
+        decoder = codecs.getincrementaldecoder(ENCODING)()
+        text = decoder.decode(head).replace('\r\n', '\n').replace('\r', '\n')
+        lines = text.splitlines(True)[:len(expected_controls)]
     except UnicodeDecodeError:
         return False
     if len(lines) != len(expected_controls):
@@ -206,6 +319,183 @@ def is_spec_file_with_header(filename):
     return True
 
 
+def _line_start_(buf, pos):
+    """offset of the line with ``pos`` if only blanks precede ``pos`` on it, else None"""
+    i = pos
+    while i > 0 and buf[i-1:i] in LEADING_BLANKS:
+        i -= 1
+    if i == 0 or buf[i-1:i] in (b'\r', b'\n'):
+        return i
+
+
+def _iter_line_starts_(pattern, buf, start=0, end=None, blanks=True):
+    """
+    iterate (line offset, match) for matches of ``pattern`` that begin a line
+    
+    :param bool blanks: allow blanks before the match (default: True)
+    """
+    end = len(buf) if end is None else end
+    for m in pattern.finditer(buf, start, end):
+        offset = _line_start_(buf, m.start())
+        if offset is None or offset < start:
+            continue
+        if not blanks and offset != m.start():
+            continue
+        yield offset, m
+
+
+def _map_file_(fp):
+    """return a read-only memory map of binary file object ``fp`` (None if empty)"""
+    if os.fstat(fp.fileno()).st_size == 0:
+        return None     # cannot map an empty file
+    return mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _line_at_(buf, start, end):
+    """return the bytes from ``start`` to the first EOL (or ``end``) in ``buf``"""
+    eol = EOL_PATTERN.search(buf, start, end)
+    if eol is not None:
+        end = eol.start()
+    return buf[start:end]
+
+
+def _indexed_block_(buf, key, start, end, base=0):
+    """
+    IndexedBlock of the block from ``start`` to ``end`` in ``buf``
+    
+    :param bytes key: the block's control word (``b"E"``, ``b"F"``, or ``b"S"``)
+    :param int base: file offset of ``buf[0]``
+    """
+    line = _line_at_(buf, start, end)
+    date_line = None
+    if key == b"S":
+        found = next(
+            _iter_line_starts_(DATE_PATTERN, buf, start + len(line), end),
+            None)
+        if found is not None:
+            date_line = _line_at_(buf, found[0], end).decode(ENCODING)
+    return IndexedBlock(
+        "#" + key.decode(ENCODING),
+        base + start,
+        end - start,
+        line.decode(ENCODING),
+        date_line)
+
+
+def _decode_block_(text):
+    """text of a block from its bytes, line endings converted to ``\\n``"""
+    text = text.decode(ENCODING)
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    if text.endswith('\n'):
+        text = text[:-1]
+    return text
+
+
+def _iter_blocks_(fp, chunk_size=ITER_CHUNK_BYTES):
+    """
+    iterate (IndexedBlock, bytes) of each block in binary file ``fp``
+    
+    The file is read one chunk at a time, from its current position
+    (which must begin a line), only the text of the block being
+    read is kept.  Any content before the first block is skipped.
+    """
+    base = fp.tell()        # file offset of buf[0]
+    buf = bytearray()
+    current = None          # (offset in buf, key) of the block being read
+    search = 0              # where to look for more blocks
+    eof = False
+    while not eof:
+        chunk = fp.read(chunk_size)
+        eof = len(chunk) == 0
+        buf += chunk
+        starts = []
+        for m in BLOCK_PATTERN.finditer(buf, search):
+            if m.end() == len(buf) and not eof:
+                break       # the word might continue in the next chunk
+            offset = _line_start_(buf, m.start())
+            if offset is not None and (current is None or offset > current[0]):
+                starts.append((offset, m.group(1)))
+        else:
+            m = None
+        search = max(0, len(buf) - 2) if m is None else m.start()
+        if eof and current is not None:
+            starts.append((len(buf), None))
+        for offset, key in starts:
+            if current is not None:
+                start = current[0]
+                yield (
+                    _indexed_block_(buf, current[1], start, offset, base),
+                    bytes(buf[start:offset]))
+            current = (offset, key)
+
+        # forget the text before the block being read
+        if current is not None:
+            drop = current[0]
+            current = (0, current[1])
+        else:
+            drop = max(buf.rfind(b'\n', 0, search), buf.rfind(b'\r', 0, search)) + 1
+        if drop > 0:
+            del buf[:drop]
+            base += drop
+            search -= drop
+
+
+def iter_scans(filename, start_offset=0, columnar=False, projection=None,
+               chunk_size=ITER_CHUNK_BYTES):
+    """
+    iterate the headers and scans of a SPEC data file, in file order
+    
+    The file is read one chunk at a time.  Each header
+    (:class:`SpecDataFileHeader`) and scan (:class:`SpecDataFileScan`)
+    is yielded once its block is complete.  Only the header in use
+    (and the number of each scan, to rename any duplicate) is kept
+    here, so the caller decides how long a scan stays in memory.
+    Interpretation is the same as with :class:`SpecDataFile`
+    (see its ``columnar`` and ``projection`` parameters).
+    
+    :param str filename: name of the SPEC data file
+    :param int start_offset: byte offset where reading starts,
+        must begin a block (such as the ``offset`` of an
+        :class:`IndexedBlock`), default: 0
+    :param int chunk_size: number of bytes read at a time
+    
+    A compressed file is decompressed as it is read (a ``start_offset``
+    is then in the decompressed content).
+    Scans read before any header (such as when starting
+    at a #S block) have an empty header.
+    """
+    if not os.path.exists(filename):
+        raise SpecDataFileNotFound('file does not exist: ' + str(filename))
+    if not is_spec_file(filename):
+        raise NotASpecDataFile('not a SPEC data file: ' + str(filename))
+    sdf = SpecDataFile(None, columnar=columnar, projection=projection)
+    sdf.fileName = filename
+    manager = plugin.get_plugin_manager()
+    sdf.compression = compressed.compression_of(filename)
+    with compressed.open_binary(filename, sdf.compression) as fp:
+        fp.seek(start_offset)
+        for block, text in _iter_blocks_(fp, chunk_size):
+            part = sdf._process_block_(manager, block, _decode_block_(text))
+            if isinstance(part, SpecDataFileHeader):
+                del sdf.headers[:-1]        # not needed by later scans
+            elif part is not None:
+                # forget the scan, keep its number to rename any duplicate
+                sdf.scans[part.scanNum] = None
+                sdf._scan_digests_.clear()
+                # no date order here: scans are yielded in file order
+                del sdf._chronology_[:]
+                sdf._chronology_keys_.clear()
+            if part is not None:
+                yield part
+
+
+def block_starts_at(fp, block):
+    """is ``block`` (an :class:`IndexedBlock`) still at its offset in binary file ``fp``?"""
+    first_line = block.first_line.encode(ENCODING)
+    fp.seek(block.offset)
+    return fp.read(len(first_line)) == first_line
+
+
 #-------------------------------------------------------------------------------------------
 
 
@@ -214,9 +504,45 @@ class SpecDataFile(object):
     """
     contents of a SPEC data file
 
+    :param str filename: name of the SPEC data file
+    :param bool indexed: keep only the location (not the text)
+        of each scan in memory, read scan text from the file
+        only when the scan is used (default: ``False``)
+    :param obj index_cache: keep a copy of the file's block index
+        on disk to avoid indexing the file again next time.
+        ``None``: no copy (default),
+        ``True``: in a hidden file next to the data file,
+        *str*: in this directory,
+        see :class:`SpecDataFileIndexCache`
+    :param bool columnar: keep the data columns of each scan
+        in one *numpy* array (``scan.data_array``), then each
+        ``scan.data[label]`` is a view of that array, not a
+        list (default: ``False``)
+    :param [str] projection: interpret only these control line keys
+        (such as ``#L``) and/or scan attributes (such as ``data``)
+        of each scan, skip the other lines (default: ``None``, all),
+        see :meth:`SpecDataFileScan.interpret`
+    :param int max_interpreted: keep the interpretation of only
+        this many scans, forget it for the scans used least recently
+        (they are interpreted again when used again),
+        (default: ``None``, keep all)
+    :param bool gzip_index: for a gzip-compressed file, keep seek
+        points while the file is read so the text of a scan can be
+        read again later without decompressing from the start of
+        the file (see :class:`~spec2nexus.compressed.GzipSeekIndex`),
+        useful when ``indexed`` (default: ``False``).  The seek points
+        are kept in the ``index_cache`` (if any), with the block index.
+
+    A file compressed with gzip, bzip2, or xz (see
+    :mod:`spec2nexus.compressed`) is decompressed as it is read.
+    Offsets of an :class:`IndexedBlock` are then in the
+    decompressed content.
+
     .. autosummary::
 
         ~dissect_file
+        ~index_file
+        ~read_block
         ~getFirstScanNumber
         ~getLastScanNumber
         ~getMaxScanNumber
@@ -225,7 +551,9 @@ class SpecDataFile(object):
         ~getScanCommands
         ~getScanNumbers
         ~getScanNumbersChronological
+        ~interpret_all
         ~read
+        ~read_tail
         ~refresh
         ~update_available
 
@@ -237,7 +565,9 @@ class SpecDataFile(object):
     scans = {}
     readOK = -1
 
-    def __init__(self, filename):
+    def __init__(self, filename, indexed=False, index_cache=None, 
+                 columnar=False, projection=None, max_interpreted=None,
+                 gzip_index=False):
         self.fileName = None
         self.headers = []
         self.scans = OrderedDict()
@@ -245,6 +575,24 @@ class SpecDataFile(object):
         self.last_scan = None
         self.mtime = 0
         self.filesize = 0
+        self.indexed = indexed
+        self.index_cache = None
+        self.columnar = columnar
+        self.projection = projection
+        self.compression = None     # or name, see compressed.compression_of()
+        self._gzip_index_ = None
+        if max_interpreted is not None:
+            max_interpreted = max(1, int(max_interpreted))
+        self.max_interpreted = max_interpreted
+        self._interpreted_scans_ = OrderedDict()    # least recently used first
+        self._blocks_ = []          # IndexedBlock of each block in the file
+        self._chronology_ = []      # (epoch, order, scan number), sorted
+        self._chronology_keys_ = set()
+        self._chronology_epoch_ = float("-inf")   # of the scan read last
+        self._scan_digests_ = {}    # content digest: scan, see SPEC_Scan
+
+        # check it now
+        plugin.get_plugin_manager().get_projection_keys(projection)
 
         if filename is not None:
             if not os.path.exists(filename):
@@ -254,6 +602,12 @@ class SpecDataFile(object):
                 raise NotASpecDataFile(
                     'not a SPEC data file: ' + str(filename))
             self.fileName = filename
+            self.compression = compressed.compression_of(filename)
+            if gzip_index and self.compression == "gzip":
+                self._gzip_index_ = compressed.GzipSeekIndex(filename)
+            if index_cache is not None:
+                self.index_cache = SpecDataFileIndexCache(
+                    filename, index_cache)
 
             self.read()
     
@@ -292,12 +646,16 @@ class SpecDataFile(object):
         identical = same_mtime and same_size
         return not identical
 
-    def refresh(self):
+    def refresh(self, tail=True):
         """
         update (refresh) the content if the file is updated
     
         returns previous last_scan or None if file not updated
 
+        :param bool tail: only read the part of the file starting with
+            the last block read before (default: ``True``),
+            see :meth:`read_tail`
+
         .. caution:  previous last_scan must be re-created if updated
         
            After calling :meth:`refresh()`, any client
@@ -315,7 +673,10 @@ class SpecDataFile(object):
         if self.update_available:
             previous_scan = self.last_scan
             
-            self.read()
+            if tail:
+                self.read_tail()
+            else:
+                self.read()
             return previous_scan
         return None
 
@@ -323,15 +684,20 @@ class SpecDataFile(object):
         """Reads a spec data file"""
         if not os.path.exists(spec_file_name):
             raise SpecDataFileNotFound('file does not exist: ' + str(spec_file_name))
+        if not is_spec_file(spec_file_name):
+            msg = 'Not a spec data file: ' + str(spec_file_name)
+            raise NotASpecDataFile(msg)
         try:
-            with open(spec_file_name, 'r') as fp:
-                buf = fp.read()
+            compression = compressed.compression_of(spec_file_name)
+            if compression is None:
+                with open(spec_file_name, 'r') as fp:
+                    buf = fp.read()
+            else:
+                with compressed.open_binary(spec_file_name, compression) as fp:
+                    buf = fp.read().decode(ENCODING)
         except IOError:
             msg = 'Could not open spec file: ' + str(spec_file_name)
             raise SpecDataFileCouldNotOpen(msg)
-        if not is_spec_file(spec_file_name):
-            msg = 'Not a spec data file: ' + str(spec_file_name)
-            raise NotASpecDataFile(msg)
 
         # caution: some files may have EOL = \r\n
         # convert all '\r\n' to '\n', then all '\r' to '\n'
@@ -368,25 +734,194 @@ class SpecDataFile(object):
             sections.append("\n".join(block))
         return sections
 
+    def index_file(self, start=0):
+        """
+        locate the blocks in the SPEC data file without keeping their text
+        
+        Same division into blocks as :meth:`dissect_file` but only
+        the byte offset and length of each block are recorded
+        (and the first line, plus the ``#D`` line of any #S block).
+        Use :meth:`read_block` to get the text of a block.
+        
+        :param int start: byte offset where indexing starts,
+            must be the start of a block (default: 0)
+        
+        RETURNS
+        
+        [IndexedBlock]
+            list of :class:`IndexedBlock`, in file order
+        
+        """
+        if not os.path.exists(self.fileName):
+            raise SpecDataFileNotFound('file does not exist: ' + str(self.fileName))
+        try:
+            if self.compression is not None:
+                fp = self._open_content_()
+            else:
+                fp = open(self.fileName, 'rb')
+        except IOError:
+            msg = 'Could not open spec file: ' + str(self.fileName)
+            raise SpecDataFileCouldNotOpen(msg)
+
+        if self.compression is not None:
+            # no memory map, decompress one part at a time
+            with fp:
+                fp.seek(start)
+                return [block for block, _text in _iter_blocks_(fp)]
+
+        blocks = []
+        with fp:
+            buf = _map_file_(fp)
+            if buf is None:
+                return blocks
+            # not "with buf:", mmap is not a context manager in Python 2.7
+            try:
+                size = len(buf)
+                if size <= start:
+                    return blocks
+                starts = [
+                    (offset, m.group(1))
+                    for offset, m in _iter_line_starts_(BLOCK_PATTERN, buf, start)
+                    ]
+                if len(starts) == 0 or starts[0][0] > start:
+                    # content before the first block
+                    end = size if len(starts) == 0 else starts[0][0]
+                    blocks.append(
+                        IndexedBlock(None, start, end - start, None, None))
+                for i, (offset, key) in enumerate(starts):
+                    if i + 1 < len(starts):
+                        end = starts[i + 1][0]
+                    else:
+                        end = size
+                    blocks.append(_indexed_block_(buf, key, offset, end))
+            finally:
+                buf.close()
+        return blocks
+
+    def read_block(self, block, buf=None):
+        """
+        return the text of ``block`` (an :class:`IndexedBlock`) from the file
+        
+        Only the bytes of this block are read and decoded.
+        Line endings are converted as in :meth:`_read_file_`.
+        
+        :param IndexedBlock block: as returned by :meth:`index_file`
+        :param obj buf: (optional) memory map (or bytes) of the file
+        """
+        if buf is None and self._gzip_index_ is not None:
+            text = self._gzip_index_.read(block.offset, block.length)
+        elif buf is None:
+            # a compressed file is decompressed up to the block
+            with compressed.open_binary(self.fileName, self.compression) as fp:
+                fp.seek(block.offset)
+                text = fp.read(block.length)
+        else:
+            text = buf[block.offset:block.offset + block.length]
+        return _decode_block_(text)
+
+    def _open_content_(self):
+        """open the (decompressed) content, to read from its start"""
+        gzip_index = self._gzip_index_
+        if gzip_index is not None and not gzip_index.complete:
+            return gzip_index.reader()  # find its seek points, too
+        return compressed.open_binary(self.fileName, self.compression)
+
+    @contextlib.contextmanager
+    def _block_reader_(self):
+        """provide a function that returns the text of a block"""
+        if self.compression is None:
+            with open(self.fileName, 'rb') as fp:
+                buf = _map_file_(fp)
+                try:
+                    yield lambda block: self.read_block(block, buf=buf)
+                finally:
+                    if buf is not None:
+                        buf.close()
+        else:
+            # decompress once, blocks are read in file order
+            with self._open_content_() as fp:
+                def read_text(block):
+                    fp.seek(block.offset)
+                    return _decode_block_(fp.read(block.length))
+                yield read_text
+
     def read(self):
         """Reads and parses a spec data file"""
-        manager = plugin.get_plugin_manager()
-        sections = self.dissect_file()
-        for block in sections:
-            if len(block) == 0:
-                continue
-            key = manager.getKey(block.splitlines()[0])
-            manager.process(key, block, self)
-            
-            if key == "#S":
-                scan = list(self.scans.values())[-1]
-                for line in scan.raw.splitlines()[1:]:
-                    if len(line) > 0:
-                        key = line.split()[0]
-                        if key in ("#D",):
-                            manager.process(key, line, scan)
-                            break
+        if self.compression is not None and self.index_cache is None:
+            self._read_content_()
+            return
+        if self.index_cache is None:
+            self._blocks_ = self.index_file()
+        else:
+            self._blocks_ = self.index_cache.read(self)
+        self._read_blocks_(self._blocks_)
+
+    def read_tail(self):
+        """
+        Reads and parses only the new content of a growing spec data file
         
+        SPEC only appends to its data file.  The last block read
+        before (usually, the scan that was still running) and any
+        new blocks after it are read and parsed.  All other blocks
+        are not read again.  Falls back to :meth:`read` if the
+        file is smaller than before or the last block has moved.
+        """
+        if (
+            self.compression is not None    # (re)read from its start
+            or len(self._blocks_) == 0 
+            or os.path.getsize(self.fileName) < self.filesize
+        ):
+            self.read()
+            return
+
+        tail = self._blocks_[-1]
+        with open(self.fileName, 'rb') as fp:
+            if not block_starts_at(fp, tail):
+                self.read()
+                return
+            if tail.key == "#E" and len(self.headers) > 0:
+                # this header block may have grown, parse it again
+                if self.headers[-1].raw == self.read_block(tail):
+                    self.headers.pop()
+
+        if self.index_cache is not None:
+            signature = self.index_cache.signature()
+        blocks = self.index_file(start=tail.offset)
+        self._blocks_ = self._blocks_[:-1] + blocks
+        if self.index_cache is not None:
+            self.index_cache.write(self._blocks_, signature)
+        self._read_blocks_(blocks)
+
+    def _read_content_(self):
+        """index and parse a compressed file, decompressed only once"""
+        manager = plugin.get_plugin_manager()
+        self._blocks_ = []
+        with self._open_content_() as fp:
+            for block, text in _iter_blocks_(fp):
+                self._blocks_.append(block)
+                if self.indexed and block.key == "#S":
+                    text = None     # read later, when needed
+                else:
+                    text = _decode_block_(text)
+                self._process_block_(manager, block, text)
+        self._read_done_()
+
+    def _read_blocks_(self, blocks):
+        """parse the blocks (list of IndexedBlock) from the file"""
+        manager = plugin.get_plugin_manager()
+        with self._block_reader_() as read_text:
+            for block in blocks:
+                if block.key is None:
+                    continue    # ignore any content before the first block
+                if self.indexed and block.key == "#S":
+                    text = None     # read later, when needed
+                else:
+                    text = read_text(block)
+                self._process_block_(manager, block, text)
+        self._read_done_()
+
+    def _read_done_(self):
+        """after blocks have been read"""
         # fix any missing parts
         if not hasattr(self, "specFile"):
             self.specFile = self.fileName
@@ -395,6 +930,30 @@ class SpecDataFile(object):
         self.filesize = os.path.getsize(self.fileName)
         self.mtime = os.path.getmtime(self.fileName)
     
+    def _process_block_(self, manager, block, text):
+        """
+        parse one block (IndexedBlock and its text, None for an indexed scan)
+        
+        returns the header or scan added (None if nothing new)
+        """
+        key = manager.getKey(block.first_line)
+        if key == "#S":
+            last = self.scans[next(reversed(self.scans))] if self.scans else None
+            manager.process(key, text, self, block=block)
+            if len(self.scans) > 0:
+                scan = self.scans[next(reversed(self.scans))]
+                if block.date_line is not None:
+                    manager.process("#D", block.date_line, scan)
+                if scan.scanNum not in self._chronology_keys_:
+                    self._add_to_chronology_(scan)
+                if scan is not last:
+                    return scan
+        else:
+            last = self.headers[-1] if self.headers else None
+            manager.process(key, text, self)
+            if self.headers and self.headers[-1] is not last:
+                return self.headers[-1]
+
     def getScan(self, scan_number=0):
         """return the scan number indicated, None if not found"""
         if int(float(scan_number)) < 1:
@@ -403,9 +962,29 @@ class SpecDataFile(object):
             scan_number = list(scanlist)[int(scan_number)]
         scan_number = str(scan_number)
         if scan_number in self.scans:
-            return self.scans[scan_number]
+            scan = self.scans[scan_number]
+            if self.max_interpreted is not None \
+                    and id(scan) in self._interpreted_scans_:
+                self._interpreted_(scan)    # used again
+            return scan
         return None
     
+    def _interpreted_(self, scan):
+        """
+        keep track of the interpreted scans, most recently used last
+        
+        Forget the interpretation of the least recently used
+        scans beyond ``max_interpreted``.
+        """
+        recent = self._interpreted_scans_
+        recent.pop(id(scan), None)
+        recent[id(scan)] = scan
+        while len(recent) > self.max_interpreted:
+            _key, old = recent.popitem(last=False)
+            old._reset_()
+            if self.indexed and old._block is not None:
+                old.raw = None      # read from the file again when needed
+    
     def getScanNumbers(self):
         """return a list of all scan numbers sorted by scan number"""
         keys = self.scans.keys()
@@ -415,12 +994,40 @@ class SpecDataFile(object):
             r = sorted(keys, key=float)
         return r
     
+    def _add_to_chronology_(self, scan):
+        """
+        keep the scan numbers sorted by date as scans are read
+        
+        The date (epoch) comes from the #D line, already parsed
+        when the scan was read.  A scan without a date is placed
+        with the scan read before it.  Scans with the same date
+        stay in the order they were read.
+        """
+        epoch = getattr(scan, "epoch", None)
+        if epoch is None:
+            epoch = self._chronology_epoch_
+        self._chronology_epoch_ = epoch
+        self._chronology_keys_.add(scan.scanNum)
+        entry = (epoch, len(self._chronology_keys_), scan.scanNum)
+        bisect.insort(self._chronology_, entry)
+
+    def _get_chronology_(self):
+        """
+        return the (epoch, order, scan number) list, sorted by date
+        
+        Sorted again only when self.scans was changed directly.
+        """
+        if len(self._chronology_) != len(self.scans):
+            self._chronology_ = []
+            self._chronology_keys_ = set()
+            self._chronology_epoch_ = float("-inf")
+            for scan in self.scans.values():
+                self._add_to_chronology_(scan)
+        return self._chronology_
+
     def getScanNumbersChronological(self):
         """return a list of all scan numbers sorted by date"""
-        def byDate_key(scan):
-            return time.strptime(scan.date)
-        scans = sorted(self.scans.values(), key=byDate_key)
-        return [_.scanNum for _ in scans]
+        return [scan_number for _e, _o, scan_number in self._get_chronology_()]
     
     def getMinScanNumber(self):
         """return the lowest numbered scan"""
@@ -432,11 +1039,11 @@ class SpecDataFile(object):
     
     def getFirstScanNumber(self):
         """return the first scan"""
-        return self.getScanNumbersChronological()[0]
+        return self._get_chronology_()[0][-1]
     
     def getLastScanNumber(self):
         """return the last scan"""
-        return self.getScanNumbersChronological()[-1]
+        return self._get_chronology_()[-1][-1]
     
     def getScanCommands(self, scan_list=None):
         """return all the scan commands as a list, with scan number"""
@@ -448,6 +1055,419 @@ class SpecDataFile(object):
                 commands.append('#S ' + str(key) + ' ' + scan.scanCmd)
         return commands
 
+    def interpret_all(self, workers=None, scan_list=None):
+        """
+        interpret the scans not interpreted yet, with a pool of processes
+        
+        :param int workers: number of processes
+            (default: ``None``, one for each CPU), 
+            ``1``: interpret in this process, one scan at a time
+        :param [str] scan_list: scan numbers to interpret
+            (default: ``None``, all the scans)
+        
+        Each process reads the same scans (by the block index) and 
+        interprets some of them.  The interpreted content of each scan
+        is sent back and kept here, as if interpreted here.
+        A scan is interpreted here if that did not work,
+        such as when its content cannot be pickled.
+        """
+        scan_list = scan_list or self.getScanNumbers()
+        scans = [
+            self.scans[str(key)]
+            for key in scan_list
+            if str(key) in self.scans
+            and not self.scans[str(key)].__interpreted__
+            ]
+        # not even by a projection
+        untouched = [scan for scan in scans if len(scan._interpreted_keys_) == 0]
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        workers = min(workers, len(untouched))
+
+        if workers > 1 and len(self._blocks_) > 0:
+            requests = [(scan.scanNum, scan._block) for scan in untouched]
+            chunk = max(1, len(requests) // (4 * workers))
+            chunks = [
+                requests[i:i+chunk] 
+                for i in range(0, len(requests), chunk)
+                ]
+            modules = sorted(set(
+                handler.__module__
+                for handler in plugin.get_plugin_manager().registry.values()
+                ))
+            # multiprocessing.Pool (not concurrent.futures): Python 2.7+
+            pool = multiprocessing.Pool(
+                processes=workers,
+                initializer=_interpret_worker_init_,
+                initargs=(
+                    self.fileName, self._blocks_, 
+                    self.columnar, self.projection, modules)
+                )
+            try:
+                pending = [
+                    pool.apply_async(_interpret_worker_, (c,)) 
+                    for c in chunks
+                    ]
+                for job in pending:
+                    try:
+                        results = job.get()
+                    except Exception:
+                        continue    # interpret these here, below
+                    for scan_number, state in results:
+                        scan = self.scans[scan_number]
+                        if state is None or scan.__interpreted__:
+                            continue
+                        if len(scan._interpreted_keys_) > 0:
+                            continue
+                        _set_scan_state_(scan, pickle.loads(state))
+            finally:
+                pool.close()
+                pool.join()
+
+        for scan in scans:
+            scan.interpret(self.projection)     # only if not done already
+
+
+# scan attributes that are not sent back from interpret_all()
+SCAN_STATE_KEPT = ('parent', 'header', '_raw', '_uninterpreted_')
+SCAN_STATE_EXCLUDED = ('parent', 'header', '_raw', '_block')
+SCAN_REGISTRIES = ('postprocessors', 'h5writers')
+EMPTY_REGISTRY = {}     # shared by all scans, never changed
+
+_worker_sdf_ = None     # SpecDataFile in an interpret_all() process
+
+
+def _interpret_worker_init_(filename, blocks, columnar, projection, modules):
+    """start an interpret_all() process: read the scans (not the text)"""
+    global _worker_sdf_
+    _worker_sdf_ = None
+    try:
+        for name in modules:
+            importlib.import_module(name)   # any custom plugins
+        sdf = SpecDataFile(
+            None, indexed=True, columnar=columnar, projection=projection)
+        sdf.fileName = filename
+        sdf.compression = compressed.compression_of(filename)
+        # text of a compressed file is kept, not decompressed again for each scan
+        sdf.indexed = sdf.compression is None
+        sdf._blocks_ = blocks
+        sdf._read_blocks_(blocks)
+        _worker_sdf_ = sdf
+    except Exception:
+        # never raise: a pool would start this process again (& again)
+        # interpret_all() interprets these scans itself
+        _worker_sdf_ = None
+
+
+def _interpret_worker_(requests):
+    """
+    interpret some scans in an interpret_all() process
+    
+    :param [(str, IndexedBlock)] requests: scan numbers and their blocks
+    :returns: [(scan number, pickled content or None)]
+    """
+    results = []
+    for scan_number, block in requests:
+        state = None
+        if _worker_sdf_ is None:
+            results.append((scan_number, state))
+            continue
+        scan = _worker_sdf_.getScan(scan_number)
+        if scan is not None and scan._block == block:
+            try:
+                scan.interpret(_worker_sdf_.projection)
+                state = pickle.dumps(
+                    _get_scan_state_(scan), 
+                    pickle.HIGHEST_PROTOCOL)
+            except Exception:
+                state = None    # interpret_all() will try again
+        results.append((scan_number, state))
+    return results
+
+
+def _copy_state_(state, excluded=()):
+    """copy of scan attributes, with new lists, dictionaries, and sets"""
+    state = dict(state)
+    for attr in excluded:
+        state.pop(attr, None)
+    for attr, value in state.items():
+        if attr in SCAN_REGISTRIES:
+            continue    # never changed
+        if isinstance(value, (list, dict, set)):
+            state[attr] = copy.copy(value)
+    return state
+
+
+def _get_attributes_(obj):
+    """all attributes of obj: in its __slots__ and its __dict__"""
+    attributes = {}
+    for attr in type(obj).__slots__:
+        try:
+            attributes[attr] = object.__getattribute__(obj, attr)
+        except AttributeError:
+            pass        # not set
+    attributes.pop("__dict__", None)
+    attributes.update(obj.__dict__)
+    return attributes
+
+
+def _set_attributes_(obj, attributes):
+    """set attributes of obj (in its __slots__ or its __dict__)"""
+    for attr, value in attributes.items():
+        setattr(obj, attr, value)
+
+
+def _add_to_registry_(header, registry, label, func):
+    """
+    return a registry (such as h5writers) with ``label: func`` added
+    
+    The registry is not changed.  The new registry is shared
+    by the scans of this header with the same entries.
+    """
+    entries = tuple(registry.items()) + ((label, func),)
+    shared = getattr(header, "_registries_", None)
+    if shared is not None and entries in shared:
+        return shared[entries]
+    new = dict(entries)
+    if shared is not None:
+        shared[entries] = new
+    return new
+
+
+def _get_registry_state_(registry):
+    """
+    entries of a registry (such as h5writers) to be sent to another process
+    
+    A method of a control line handler is sent by the handler key and
+    the method name (a bound method cannot be pickled with Python 2).
+    """
+    manager = plugin.get_plugin_manager()
+    entries = []
+    for label, func in registry.items():
+        handler = getattr(func, "__self__", None)
+        key = getattr(handler, "key", None)
+        if key is not None and manager.get_handler(key) is handler:
+            func = (key, func.__func__.__name__)
+        entries.append((label, func))
+    return entries
+
+
+def _set_registry_state_(header, entries):
+    """registry from the entries made by _get_registry_state_()"""
+    manager = plugin.get_plugin_manager()
+    registry = EMPTY_REGISTRY
+    for label, func in entries:
+        if isinstance(func, tuple):
+            key, name = func
+            func = getattr(manager.get_handler(key), name)
+        registry = _add_to_registry_(header, registry, label, func)
+    return registry
+
+
+def _get_scan_state_(scan):
+    """content of an interpreted scan, to be sent to another process"""
+    state = {
+        k: v
+        for k, v in _get_attributes_(scan).items()
+        if k not in SCAN_STATE_EXCLUDED
+        }
+    if scan.data_array is not None:
+        # do not send copies of the data_array views
+        state["data"] = {
+            k: (None if getattr(v, "base", None) is scan.data_array else v)
+            for k, v in scan.data.items()
+            }
+    for attr in SCAN_REGISTRIES:
+        state[attr] = _get_registry_state_(state[attr])
+    return state
+
+
+def _set_scan_state_(scan, state):
+    """keep the content of a scan interpreted in another process"""
+    state = dict(state)
+    for attr in SCAN_REGISTRIES:
+        state[attr] = _set_registry_state_(scan.header, state[attr])
+    _set_attributes_(scan, state)
+    if scan.data_array is not None:
+        for col, label in enumerate(scan.L[:len(scan.data_array)]):
+            if scan.data.get(label, 0) is None:
+                scan.data[label] = scan.data_array[col]
+
+
+#-------------------------------------------------------------------------------------------
+
+
+class SpecDataFileIndexCache(object):
+    """
+    on-disk copy of the block index of a SPEC data file
+
+    :param str filename: name of the SPEC data file
+    :param obj location: ``True`` to keep the copy in a hidden file
+        next to the data file or name of a directory to keep it in
+
+    The copy (JSON) holds the :class:`IndexedBlock` list (block offsets,
+    #S lines with scan numbers & commands, #D lines, and block order
+    which tells which header each scan belongs to), with the size,
+    modification time, and a hash of the first bytes of the data file.
+    For a gzip file read with ``gzip_index=True``, the seek points 
+    are kept, too (see
+    :meth:`~spec2nexus.compressed.GzipSeekIndex.saved_points`).
+    
+    If size, mtime, and hash match, the data file is not indexed again.
+    If the data file has grown (same hash), only the new content is
+    indexed.  Otherwise, or if the copy cannot be used for any
+    reason, the data file is indexed again and the copy is replaced.
+
+    .. autosummary::
+
+        ~read
+        ~write
+
+    """
+
+    def __init__(self, filename, location=True):
+        self.fileName = os.path.abspath(filename)
+        if location is True:
+            path, name = os.path.split(self.fileName)
+            name = "." + name
+        else:
+            path = location
+            digest = hashlib.sha1(self.fileName.encode(ENCODING)).hexdigest()
+            name = os.path.basename(self.fileName) + "-" + digest[:16]
+        self.cache_file = os.path.join(path, name + INDEX_CACHE_SUFFIX)
+        self.gzip_points = None     # from the copy, see load()
+
+    def signature(self, prefix_length=None):
+        """describe the data file (as it is now)"""
+        size = os.path.getsize(self.fileName)
+        if prefix_length is None:
+            prefix_length = min(size, INDEX_PREFIX_BYTES)
+        with open(self.fileName, "rb") as fp:
+            prefix = fp.read(prefix_length)
+        return dict(
+            path=self.fileName,
+            size=size,
+            mtime=os.path.getmtime(self.fileName),
+            prefix_length=prefix_length,
+            prefix_hash=hashlib.sha1(prefix).hexdigest(),
+        )
+
+    def load(self):
+        """
+        return (signature, [IndexedBlock]) from the copy or None
+        
+        Any gzip seek points of the copy are kept in ``gzip_points``.
+        """
+        self.gzip_points = None
+        try:
+            with open(self.cache_file, "r") as fp:
+                cache = json.load(fp)
+            if cache.get("version") != INDEX_CACHE_VERSION:
+                return None
+            self.gzip_points = cache.get("gzip_points")
+            blocks = []
+            for key, offset, length, first_line, date_line in cache["blocks"]:
+                if not isinstance(offset, int) or not isinstance(length, int):
+                    return None
+                blocks.append(
+                    IndexedBlock(key, offset, length, first_line, date_line))
+            return cache["signature"], blocks
+        except (IOError, OSError, ValueError, KeyError, TypeError):
+            return None     # missing or corrupt, will be replaced
+
+    def read(self, sdf):
+        """
+        return the block index of ``sdf``, from the copy when possible
+        
+        :param SpecDataFile sdf: the data file to be indexed
+        """
+        cached = self.load()
+        if cached is not None:
+            known, blocks = cached
+            now = self.signature(known.get("prefix_length"))
+            if now == known and len(blocks) > 0:
+                gzip_index = sdf._gzip_index_
+                if gzip_index is None:
+                    return blocks
+                try:
+                    if self.gzip_points is not None:
+                        gzip_index.restore_points(self.gzip_points)
+                        return blocks
+                except (ValueError, TypeError, IndexError, zlib.error):
+                    pass    # corrupt
+                # index again, to find the gzip seek points
+            if (
+                len(blocks) > 0
+                and sdf.compression is None
+                and known.get("path") == now["path"]
+                and known.get("prefix_hash") == now["prefix_hash"]
+                and known.get("size", now["size"] + 1) <= now["size"]
+            ):
+                # file has grown, index from its last block
+                tail = blocks[-1]
+                with open(self.fileName, "rb") as fp:
+                    ok = block_starts_at(fp, tail)
+                if ok:
+                    signature = self.signature()
+                    blocks = blocks[:-1] + sdf.index_file(start=tail.offset)
+                    self.write(blocks, signature)
+                    return blocks
+
+        signature = self.signature()    # before indexing, in case file grows
+        blocks = sdf.index_file()
+        gzip_points = None
+        if sdf._gzip_index_ is not None:
+            gzip_points = sdf._gzip_index_.saved_points()
+        self.write(blocks, signature, gzip_points)
+        return blocks
+
+    def write(self, blocks, signature=None, gzip_points=None):
+        """
+        replace the copy on disk (silently ignore if cannot write)
+        
+        :param [IndexedBlock] blocks: block index of the data file
+        :param dict signature: describes the data file when indexed
+        :param list gzip_points: seek points of a gzip file, see
+            :meth:`~spec2nexus.compressed.GzipSeekIndex.saved_points`
+        """
+        cache = dict(
+            version=INDEX_CACHE_VERSION,
+            signature=signature or self.signature(),
+            blocks=[list(b) for b in blocks],
+        )
+        if gzip_points is not None:
+            cache["gzip_points"] = gzip_points
+        temporary = self.cache_file + ".tmp"
+        try:
+            path = os.path.dirname(self.cache_file)
+            if not os.path.exists(path):
+                os.makedirs(path)
+            with open(temporary, "w") as fp:
+                json.dump(cache, fp)
+            _replace_file_(temporary, self.cache_file)
+        except Exception:
+            # as when reading: without a copy, the file is indexed again
+            # such as a read-only location
+            try:
+                os.remove(temporary)
+            except (IOError, OSError):
+                pass
+
+
+def _replace_file_(source, target):
+    """rename ``source`` as ``target``, replace any existing ``target``"""
+    if hasattr(os, "replace"):
+        os.replace(source, target)      # atomic, Python 3.3+
+        return
+    try:
+        os.rename(source, target)
+    except OSError:
+        # Windows (Python 2.7): rename does not replace
+        if not os.path.exists(target):
+            raise
+        os.remove(target)
+        os.rename(source, target)
+
 
 #-------------------------------------------------------------------------------------------
 
@@ -466,6 +1486,12 @@ class SpecDataFileHeader(object):
 
     """
 
+    # Attributes defined by plugins are kept in __dict__.
+    __slots__ = (
+        'parent', 'file', 'raw', 'date', 'epoch', 
+        'postprocessors', 'h5writers', '_registries_', 
+        '__dict__')
+
     def __init__(self, buf, parent = None):
         #----------- initialize the instance variables
         self.parent = parent        # instance of SpecDataFile
@@ -481,6 +1507,7 @@ class SpecDataFileHeader(object):
         self.raw = buf
         self.postprocessors = {}
         self.h5writers = {}
+        self._registries_ = {}      # shared by its scans, see _add_to_registry_()
 
     def interpret(self):
         """ interpret the supplied buffer with the spec data file header"""
@@ -550,25 +1577,49 @@ class SpecDataFileScan(object):
 
     """
 
+    # Attributes of every scan are kept in slots (no dictionary for each).
+    # Attributes defined by plugins are kept in __dict__.
+    __slots__ = (
+        'parent', 'header', 'specFile', 'S', 'scanNum', 'scanCmd', 
+        'date', 'epoch', '_block', '_raw', '_prefix_digest_', 
+        'postprocessors', 'h5writers', '_interpreter_comments_', 
+        '_interpreted_keys_', '_uninterpreted_', 
+        '__lazy_interpret__', '__interpreted__', 
+        '__dict__')
+
+    # The attributes defined in PluginManager().lazy_attributes
+    # are set only after a call to self.interpret()
+    # That call is triggered on the first call for any of these attributes.
+    # Until then, they are not found (see __getattr__).
+    # These default values (shared by all scans) are copied then.
+    _lazy_defaults_ = dict(
+        comments = [],
+        data = {},
+        data_array = None,      # all of data, when parent is columnar
+        data_lines = [],
+        G = {},
+        L = [],
+        M = '',
+        positioner = {},
+        N = -1,
+        P = [],
+        Q = '',
+        T = '',
+        V = [],
+        column_first = '',
+        column_last = '',
+        )
+
     def __init__(self, header, buf, parent=None):
         self.parent = parent        # instance of SpecDataFile
-        self.comments = []
-        self.data = {}
-        self.data_lines = []
         self.date = ''
-        self.G = {}
         self.header = header        # index number of relevant #F section previously interpreted
-        self.L = []
-        self.M = ''
-        self.positioner = {}
-        self.N = -1
-        self.P = []
-        self.Q = ''
+        self._block = None          # IndexedBlock, location of buf in the file
         self.raw = buf
         self.S = ''
         self.scanNum = -1
         self.scanCmd = ''
-        self._interpreter_comments_ = []
+        self._interpreter_comments_ = None      # list, when needed
         if parent is not None:
             # avoid changing the interface for clients
             if isinstance(parent, SpecDataFile):
@@ -580,28 +1631,44 @@ class SpecDataFileScan(object):
                 self.specFile = self.header.parent.fileName
         else:
             self.specFile = None
-        self.T = ''
-        self.V = []
-        self.column_first = ''
-        self.column_last = ''
-        self.postprocessors = {}
-        self.h5writers = {}
-    
-        # the attributes defined in PluginManager().lazy_attributes
-        # are set only after a call to self.interpret()
-        # That call is triggered on the first call for any of these attributes.
+        # registries are replaced (not changed) when added to,
+        # see _add_to_registry_()
+        self.postprocessors = EMPTY_REGISTRY
+        self.h5writers = EMPTY_REGISTRY
+        self._interpreted_keys_ = frozenset()   # by a projection
         self.__lazy_interpret__ = True
         self.__interpreted__ = False
     
     def __str__(self):
         return self.S
     
-    def __getattribute__(self, attr):
+    @property
+    def raw(self):
+        """text of this scan, read from the data file if not in memory"""
+        if self._raw is None and self._block is not None:
+            self._raw = self.parent.read_block(self._block)
+        return self._raw
+    
+    @raw.setter
+    def raw(self, buf):
+        self._raw = buf
+    
+    def __getattr__(self, attr):
+        # called only when attr is not found, 
+        # such as a lazy attribute before self.interpret()
         manager = plugin.get_plugin_manager()
         if attr in manager.lazy_attributes:
-            if self.__lazy_interpret__:
+            if getattr(self, "__lazy_interpret__", False):
+                self.interpret(self._default_projection_())
+                if attr in self.__dict__:
+                    return self.__dict__[attr]
+            if (self._projected_() and attr not in 
+                    manager.get_projection_attributes(self._interpreted_keys_)):
+                # not in the projection: interpret all of the scan now
                 self.interpret()
-        return object.__getattribute__(self, attr)
+                return object.__getattribute__(self, attr)
+        raise AttributeError(
+            "'%s' object has no attribute '%s'" % (type(self).__name__, attr))
     
     def get_macro_name(self):
         """
@@ -609,12 +1676,51 @@ class SpecDataFileScan(object):
         """
         return self.scanCmd.split()[0]
 
-    def interpret(self):
-        """interpret the supplied buffer with the spec scan data"""
+    def interpret(self, projection=None):
+        """
+        interpret the supplied buffer with the spec scan data
+        
+        :param [str] projection: interpret only these control line keys
+            (such as ``#L``) and/or scan attributes (such as ``data``),
+            skip the other lines (default: ``None``, interpret all lines)
+        
+        A later call with more keys or attributes interprets the scan
+        again, from the beginning, with the lines of both projections.
+        A later call without a projection (or reading any scan attribute
+        outside of the projection) interprets all lines.
+        Once all lines are interpreted, ``interpret()`` does nothing.
+        
+        The first read of a scan attribute (before any call to
+        ``interpret()``) interprets with the projection of the
+        SpecDataFile.
+        """
         manager = plugin.get_plugin_manager()
         if self.__interpreted__:    # do not do this twice
             return
+        keys = manager.get_projection_keys(projection)
+        done = self._interpreted_keys_
+        if len(done) > 0:
+            # interpreted before, with a projection
+            if keys is not None and keys.issubset(done):
+                return
+            if keys is not None:
+                keys = keys.union(done)
+            # start again from the beginning, with more lines
+            self._reset_()
+            done = self._interpreted_keys_
+        elif keys is not None or self._limited_():
+            # keep what is needed to start again
+            self._uninterpreted_ = _copy_state_(
+                _get_attributes_(self), SCAN_STATE_KEPT)
         self.__lazy_interpret__ = False     # set now to avoid recursion
+        if keys is None:
+            defined = self._lazy_defaults_
+        else:
+            # others are left unset, to be interpreted when read
+            defined = manager.get_projection_attributes(keys)
+        for attr, value in self._lazy_defaults_.items():
+            if attr in defined and attr not in self.__dict__:
+                self.__dict__[attr] = copy.copy(value)
         lines = self.raw.splitlines()
         for _i, line in enumerate(lines, start=1):
             if len(line) == 0:
@@ -627,8 +1733,9 @@ class SpecDataFileScan(object):
                 # log message instead of raise exception
                 # https://github.com/prjemian/spec2nexus/issues/57
                 key = UNRECOGNIZED_KEY
-                manager.process(key, line, self)
-            elif key != '#S':        # avoid recursion
+            if keys is not None and key not in keys:
+                continue            # not in the projection
+            if key != '#S':         # avoid recursion
                 # most of the work is done here
                 manager.process(key, line, self)
 
@@ -636,7 +1743,39 @@ class SpecDataFileScan(object):
         for func in self.postprocessors.values():
             func(self)
         
-        self.__interpreted__ = True
+        if keys is None:
+            if not self._limited_() and hasattr(self, "_uninterpreted_"):
+                del self._uninterpreted_
+            self.__interpreted__ = True
+        else:
+            self._interpreted_keys_ = done.union(keys)
+        if self._limited_():
+            self.parent._interpreted_(self)
+    
+    def _default_projection_(self):
+        """projection of the SpecDataFile, if any"""
+        if isinstance(self.parent, SpecDataFile):
+            return self.parent.projection
+    
+    def _projected_(self):
+        """interpreted with a projection (not all lines)?"""
+        if getattr(self, "__interpreted__", True):
+            return False
+        return len(getattr(self, "_interpreted_keys_", ())) > 0
+    
+    def _limited_(self):
+        """is the number of interpreted scans limited?"""
+        return getattr(self.parent, "max_interpreted", None) is not None
+    
+    def _reset_(self):
+        """forget the interpretation, as before :meth:`interpret()`"""
+        state = getattr(self, "_uninterpreted_", None)
+        if state is None:
+            return      # not kept
+        for attr in _get_attributes_(self):
+            if attr not in state and attr not in SCAN_STATE_KEPT:
+                delattr(self, attr)
+        _set_attributes_(self, _copy_state_(state))
     
     def add_interpreter_comment(self, comment):
         """
@@ -644,6 +1783,8 @@ class SpecDataFileScan(object):
         
         see issue #66: https://github.com/prjemian/spec2nexus/issues/66
         """
+        if self._interpreter_comments_ is None:
+            self._interpreter_comments_ = []
         self._interpreter_comments_.append(comment)
     
     def get_interpreter_comments(self):
@@ -652,7 +1793,7 @@ class SpecDataFileScan(object):
         
         see issue #66: https://github.com/prjemian/spec2nexus/issues/66
         """
-        return self._interpreter_comments_
+        return self._interpreter_comments_ or []
 
     def addPostProcessor(self, label, func):
         """
@@ -664,7 +1805,8 @@ class SpecDataFileScan(object):
         The postprocessors will be called at the end of scan data interpretation.
         """
         if label not in self.postprocessors:
-            self.postprocessors[label] = func
+            self.postprocessors = _add_to_registry_(
+                self.header, self.postprocessors, label, func)
     
     def addH5writer(self, label, func):
         """
@@ -676,7 +1818,8 @@ class SpecDataFileScan(object):
         The writers will be called when the HDF5 file is to be written.
         """
         if label not in self.h5writers:
-            self.h5writers[label] = func
+            self.h5writers = _add_to_registry_(
+                self.header, self.h5writers, label, func)
     
     def _interpret_data_row(self, row_text):
         buf = {}
@@ -58,6 +58,9 @@ class NoDataToPlot(ValueError):
     pass
 
 ABORTED_ATTRIBUTE_TEXT = '_aborted_'
+# control lines interpreted for a plot (None: everything in each scan)
+# #C: comments (such as "Scan aborted after 0 points.", see ABORTED_ATTRIBUTE_TEXT)
+PLOT_PROJECTION = ('L', 'data', '#C')
 
 
 class Selector(singletons.Singleton):
@@ -721,7 +724,7 @@ class MeshPlotter(ImageMaker):
             for key, spectrum in sorted(self.scan.data[spec.MCA_DATA_KEY].items()):
                 num_channels = len(spectrum[0])
                 data_shape.append(num_channels)
-                mca = numpy.array(spectrum)
+                mca = numpy.asarray(spectrum)
                 data = utils.reshape_data(mca, data_shape)
                 channels = range(1, num_channels+1)
                 ds_name = '_' + key + '_'
@@ -747,11 +750,20 @@ class MeshPlotter(ImageMaker):
 #         raise NotImplementedError(self.__class__.__name__ + '() is not ready')
 
 
-def openSpecFile(specFile):
+def openSpecFile(specFile, index_cache=None, projection=None, max_interpreted=None):
     """
     convenience routine so that others do not have to `import spec2nexus.spec`
+    
+    :param str specFile: name of SPEC data file
+    :param obj index_cache: see :class:`~spec2nexus.spec.SpecDataFile`
+    :param [str] projection: see :class:`~spec2nexus.spec.SpecDataFile`
+    :param int max_interpreted: see :class:`~spec2nexus.spec.SpecDataFile`
     """
-    sd = spec.SpecDataFile(specFile)
+    sd = spec.SpecDataFile(
+        specFile, 
+        index_cache=index_cache, 
+        projection=projection, 
+        max_interpreted=max_interpreted)
     return sd
 
 
@@ -762,9 +774,17 @@ def main():
     p.add_argument('specFile',    help="SPEC data file name")
     p.add_argument('scan_number', help="scan number in SPEC file", type=str)
     p.add_argument('plotFile',    help="output plot file name")
+    p.add_argument(
+        '--index-cache',
+        metavar='DIR',
+        default=None,
+        help="keep a copy of the SPEC data file index in this directory")
     args = p.parse_args()
     
-    sfile = openSpecFile(args.specFile)
+    sfile = openSpecFile(
+        args.specFile, 
+        index_cache=args.index_cache, 
+        projection=PLOT_PROJECTION)
     scan = sfile.getScan(args.scan_number)
     image_maker = Selector().auto(scan)
     plotter = image_maker()
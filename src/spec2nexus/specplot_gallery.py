@@ -91,6 +91,8 @@ class PlotSpecFileScans(object):
     
     :param [str] filelist: list of SPEC data files to be checked
     :param str plotDir: name of base directory to store output image thumbnails
+    :param str index_cache: name of directory to keep copies of
+        SPEC data file indexes (default: ``None``, no copies)
 
     .. autosummary::
     
@@ -102,10 +104,11 @@ class PlotSpecFileScans(object):
 
     """
 
-    def __init__(self, filelist, plotDir = None, reverse_chronological = False):
+    def __init__(self, filelist, plotDir = None, reverse_chronological = False, index_cache = None):
         self.filelist = filelist
         self.plotDir = plotDir or os.getcwd()
         self.reversed = reverse_chronological
+        self.index_cache = index_cache
 
         for specFile in filelist:
             self.plot_all_scans(specFile)
@@ -137,7 +140,11 @@ class PlotSpecFileScans(object):
 
         try:
             logger("SPEC data file: %s" % specFile)
-            sd = specplot.openSpecFile(specFile)
+            sd = specplot.openSpecFile(
+                specFile, 
+                index_cache=self.index_cache, 
+                projection=specplot.PLOT_PROJECTION,
+                max_interpreted=spec.MAX_INTERPRETED_SCANS)
         except FileNotFoundError:
             return    # could not open file, be silent about it
         if len(sd.headers) == 0:    # no scan header found, again, silence
@@ -473,6 +480,10 @@ def main():
     msg += ' (default:' + pwd + ')'
     p.add_argument('-d', '--dir', help=msg)
 
+    msg = 'directory to keep copies of SPEC data file indexes'
+    msg += ' (avoids indexing unchanged files again)'
+    p.add_argument('--index-cache', metavar='DIR', help=msg)
+
     args = p.parse_args()
 
     specplots_dir = args.dir or pwd
@@ -503,7 +514,8 @@ def main():
     PlotSpecFileScans(
         file_list, 
         specplots_dir, 
-        reverse_chronological=args.reverse_chronological)
+        reverse_chronological=args.reverse_chronological,
+        index_cache=args.index_cache)
     logger('<'*10 + ' finished')
 
 
@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#-----------------------------------------------------------------------------
+# :author:    Pete R. Jemian
+# :email:     prjemian@gmail.com
+# :copyright: (c) 2014-2019, Pete R. Jemian
+#
+# Distributed under the terms of the Creative Commons Attribution 4.0 International Public License.
+#
+# The full license is in the file LICENSE.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+"""
+Write synthetic SPEC data files, such as for benchmarks.
+
+The same parameters (and ``seed``) always write the same file.
+
+.. autosummary::
+
+    ~make_spec_file
+
+EXAMPLE::
+
+    >>> from spec2nexus import synthetic
+    >>> info = synthetic.make_spec_file(
+    ...     "/tmp/synthetic.dat", scans=100, rows=500, mca_channels=1024)
+    >>> info["bytes"], info["scans"], info["rows"]
+
+"""
+
+import math
+import os
+import random
+import time
+
+
+EPOCH = 1262304000      # 2010-01-01T00:00:00 UTC, start of the first scan
+LABELS_PER_ROW = 8      # in numbered control lines such as #O0, #O1, ...
+MCA_VALUES_PER_LINE = 16    # as SPEC writes @A lines
+
+
+def _numbered_rows_(key, items, per_row=LABELS_PER_ROW):
+    """control lines such as ``#O0 ..., #O1 ...`` with the items"""
+    return [
+        "%s%d %s" % (key, i, "  ".join(items[start:start + per_row]))
+        for i, start in enumerate(range(0, len(items), per_row))
+        ]
+
+
+def _spec_date_(epoch):
+    """SPEC date text (such as ``Wed Nov 03 13:39:34 2010``) of the epoch"""
+    return time.strftime("%a %b %d %H:%M:%S %Y", time.gmtime(epoch))
+
+
+def make_spec_file(
+        filename,
+        scans=10,
+        rows=100,
+        columns=8,
+        mca_channels=0,
+        positioners=24,
+        unicat=0,
+        uxml=False,
+        mesh_every=0,
+        seed=0):
+    """
+    write a synthetic SPEC data file, return a dict that describes it
+
+    :param str filename: name of the file to write (replaced)
+    :param int scans: number of scans
+    :param int rows: number of data rows in each scan
+        (a mesh scan has about as many, and one more column)
+    :param int columns: number of data columns (at least 3)
+    :param int mca_channels: length of the MCA spectrum (``@A``)
+        with each data row (default: 0, no MCA data)
+    :param int positioners: number of positioners (``#O`` & ``#P``)
+    :param int unicat: number of UNICAT metadata items (``#H`` & ``#V``),
+        default: 0, none
+    :param bool uxml: write ``#UXML`` metadata in each scan
+    :param int mesh_every: every *n*-th scan is a 2-D ``mesh``
+        scan (default: 0, none)
+    :param int seed: for the (repeatable) random values
+
+    The dict has the keys of the parameters and:
+    ``bytes`` (file size), ``rows`` (total number of data rows),
+    and ``labels`` (data column labels of the scans).
+    """
+    generator = random.Random(seed)
+    columns = max(3, columns)
+    motors = ["mot%03d" % i for i in range(positioners)]
+    scanned = motors[0] if len(motors) > 0 else "motor"
+    stepped = motors[1] if len(motors) > 1 else "motor2"
+    counters = ["det%02d" % i for i in range(columns - 2)]
+    labels = [scanned, "seconds"] + counters[:-1] + ["I0"]
+    metadata = ["md%03d" % i for i in range(unicat)]
+    basename = os.path.basename(filename)
+    total_rows = 0
+
+    lines = [
+        "#F " + basename,
+        "#E %d" % EPOCH,
+        "#D " + _spec_date_(EPOCH),
+        "#C %s  User = synthetic" % basename,
+        ]
+    lines += _numbered_rows_("#O", motors)
+    lines += _numbered_rows_("#o", [m.upper() for m in motors])
+    lines += _numbered_rows_("#J", ["seconds"] + counters[:-1] + ["I0"])
+    lines += _numbered_rows_("#j", ["sec"] + counters[:-1] + ["I0"])
+    lines += _numbered_rows_("#H", metadata)
+    lines.append("")
+
+    with open(filename, "w") as fp:
+        fp.write("\n".join(lines) + "\n")
+        for scan_number in range(1, scans + 1):
+            epoch = EPOCH + 60 * scan_number
+            mesh = mesh_every > 0 and scan_number % mesh_every == 0
+            if mesh:
+                intervals = max(1, int(math.sqrt(rows)) - 1)
+                command = "mesh  %s -1 1 %d  %s -1 1 %d  1" % (
+                    scanned, intervals, stepped, intervals)
+                scan_labels = [scanned, stepped] + labels[1:]
+                points = [
+                    (-1 + 2.0 * i / intervals, -1 + 2.0 * j / intervals)
+                    for j in range(intervals + 1)
+                    for i in range(intervals + 1)
+                    ]
+            else:
+                intervals = max(1, rows - 1)
+                command = "ascan  %s -1 1  %d 1" % (scanned, intervals)
+                scan_labels = labels
+                points = [(-1 + 2.0 * i / intervals, None) for i in range(rows)]
+
+            lines = [
+                "#S %d  %s" % (scan_number, command),
+                "#D " + _spec_date_(epoch),
+                "#T 1  (Seconds)",
+                ]
+            lines += _numbered_rows_(
+                "#P", ["%.6g" % generator.uniform(-180, 180) for _ in motors])
+            lines += _numbered_rows_(
+                "#V", ["%.6g" % generator.uniform(0, 1000) for _ in metadata])
+            if uxml:
+                lines += [
+                    '#UXML <group name="sample" NX_class="NXsample">',
+                    '#UXML   <dataset name="temperature" type="float"'
+                    ' units="K">%.3f</dataset>' % generator.uniform(4, 300),
+                    '#UXML   <dataset name="description">synthetic</dataset>',
+                    '#UXML </group>',
+                    ]
+            lines.append("#N %d" % len(scan_labels))
+            lines.append("#L " + "  ".join(scan_labels))
+            if mca_channels > 0:
+                lines.append("#@MCA 16C")
+                lines.append(
+                    "#@CHANN %d 0 %d 1" % (mca_channels, mca_channels - 1))
+
+            for x, y in points:
+                if mca_channels > 0:
+                    spectrum = [
+                        str(int(generator.expovariate(0.1)))
+                        for _ in range(mca_channels)]
+                    parts = [
+                        " ".join(spectrum[i:i + MCA_VALUES_PER_LINE])
+                        for i in range(0, mca_channels, MCA_VALUES_PER_LINE)]
+                    lines.append("@A " + "\\\n ".join(parts))
+                values = ["%.6g" % x]
+                if y is not None:
+                    values.append("%.6g" % y)
+                values.append("1")
+                values += [
+                    "%d" % generator.randint(0, 100000)
+                    for _ in range(len(scan_labels) - len(values))]
+                lines.append(" ".join(values))
+            total_rows += len(points)
+            fp.write("\n".join(lines) + "\n\n")
+
+    return dict(
+        filename=filename,
+        bytes=os.path.getsize(filename),
+        scans=scans,
+        rows=total_rows,
+        columns=columns,
+        mca_channels=mca_channels,
+        positioners=positioners,
+        unicat=unicat,
+        uxml=uxml,
+        mesh_every=mesh_every,
+        seed=seed,
+        labels=labels,
+        )
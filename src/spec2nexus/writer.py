@@ -17,6 +17,7 @@
 
 import h5py
 import numpy as np
+import os
 
 from . import eznx
 from . import spec
@@ -28,8 +29,61 @@ from . import utils
 CONTAINER_CLASS = 'NXnote'         # any additional freeform information not covered by the other base classes
 #CONTAINER_CLASS = 'NXparameters'   # Container for parameters, usually used in processing or analysis
 #CONTAINER_CLASS = 'NXcollection'    # Use NXcollection to gather together any set of terms
+STREAM_CHUNK_ROWS = 1024    # data rows in each chunk of a live (growing) dataset
+# The free space (such as of an NXentry deleted to be written again)
+# is kept in the file, for re-use by any later update.
+# Otherwise, HDF5 forgets it when the file is closed.
+FILE_SPACE_OPTIONS = dict(fs_strategy="fsm", fs_persist=True)
         
 
+# root attribute: number of entries written again (since the file was written)
+REWRITTEN_ATTRIBUTE = "spec2nexus_entries_rewritten"
+        
+
+def create_file(hdf_file, **kwargs):
+    """
+    create (overwrite) an HDF5 file that keeps its free space
+    
+    :param str hdf_file: name of NeXus/HDF5 file
+    :param kwargs: any other keywords for :class:`h5py.File`
+    :returns: h5py file object, opened for writing
+    
+    Uses :data:`FILE_SPACE_OPTIONS` when supported 
+    (h5py 2.10 and HDF5 1.10.1, or newer).
+    """
+    try:
+        return h5py.File(hdf_file, "w", **dict(FILE_SPACE_OPTIONS, **kwargs))
+    except (TypeError, ValueError):
+        # free space tracking not supported by this h5py or HDF5
+        return h5py.File(hdf_file, "w", **kwargs)
+
+
+def repack(hdf_file):
+    """
+    copy the content of an HDF5 file to a new file of the same name
+    
+    :param str hdf_file: name of NeXus/HDF5 file
+    
+    As ``h5repack`` (from the HDF5 tools), the new file has none of 
+    the space left by content deleted from the old file.
+    """
+    temporary = hdf_file + ".repack"
+    source = h5py.File(hdf_file, "r")
+    try:
+        target = create_file(temporary)
+        try:
+            for name, value in source.attrs.items():
+                if name != REWRITTEN_ATTRIBUTE:
+                    target.attrs[name] = value
+            for name in source:
+                source.copy(source[name], target, name=name)
+        finally:
+            target.close()
+    finally:
+        source.close()
+    spec._replace_file_(temporary, hdf_file)
+
+
 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
 
@@ -39,10 +93,24 @@ class Writer(object):
     writes out scans from SPEC data file to NeXus HDF5 file
     
     :param obj spec_data: instance of :class:`~spec2nexus.spec.SpecDataFile`
+    :param bool chunks: write chunked datasets, shape chosen by
+        :func:`~spec2nexus.eznx.chunk_shape` (default: False, contiguous)
+    :param str compression: ``gzip`` or ``lzf`` (default: None, not compressed)
+    :param int compression_level: 0 .. 9 for ``gzip`` (default: None)
+    :param bool shuffle: apply the byte shuffle filter (default: False)
+
+    Chunking, compression, and shuffle apply to the scan data
+    (columns, mesh arrays, MCA spectra) and other datasets
+    written with :meth:`write_ds`, not to small datasets.
     """
 
-    def __init__(self, spec_data):
+    def __init__(self, spec_data, chunks=False, compression=None, compression_level=None, shuffle=False):
         self.spec = spec_data
+        self.storage = eznx.storage_options(
+            chunks=chunks, 
+            compression=compression, 
+            compression_level=compression_level, 
+            shuffle=shuffle)
         
     def save(self, hdf_file, scan_list=None):
         """
@@ -77,43 +145,127 @@ class Writer(object):
         :param [int] scanlist: list of scan numbers to be read
         """
         scan_list = scan_list or []
-        root = eznx.makeFile(hdf_file, **self.root_attributes())
+        root = create_file(hdf_file)
+        eznx.addAttributes(root, **self.root_attributes())
         pick_first_entry = True
         for key in scan_list:
-            nxentry = eznx.makeGroup(root, 'S'+str(key), 'NXentry')
-            eznx.makeDataset(
-                nxentry, 
-                'definition', 
-                'NXspecdata', 
-                description='NeXus application definition (status pending)')
-            self.save_scan(nxentry, self.spec.getScan(key))
+            self.save_entry(root, key, self.spec.getScan(key))
             if pick_first_entry:
                 pick_first_entry = False
                 eznx.addAttributes(root, default='S'+str(key))
-            if 'data' not in nxentry:
-                # NXentry MUST have a NXdata group with data for default plot
-                nxdata = eznx.makeGroup(
-                    nxentry, 
-                    'data', 
-                    'NXdata',
-                    signal='no_y_data',
-                    axes='no_x_data',
-                    no_x_data_indices=[0,],
-                    )
-                eznx.makeDataset(
-                    nxdata, 
-                    "no_x_data", 
-                    (0, 1), 
-                    units='none',
-                    long_name='no data points in this scan')
-                eznx.makeDataset(
-                    nxdata, 
-                    "no_y_data", 
-                    (0, 1), 
-                    units='none',
-                    long_name='no data points in this scan')
         root.close()    # be CERTAIN to close the file
     
+    def update(self, hdf_file, scan_list=None):
+        """
+        write only new (or changed) scans to an existing NeXus HDF5 file
+        
+        For a SPEC data file that grows one scan at a time, the cost of 
+        an update is proportional to the new content.  Each **NXentry** 
+        records the location of its scan in the SPEC data file (attributes 
+        ``SPEC_scan_offset`` and ``SPEC_scan_bytes``).  An entry is 
+        written again only when that has changed (such as the last scan, 
+        still being written by SPEC).  An entry written without these
+        attributes is written again only if it is the last scan.
+        
+        Writes a new file (as :meth:`save`) if ``hdf_file`` does not exist.
+        
+        The space of an entry written again is re-used by later
+        entries when the file was written by :meth:`save` 
+        (see :func:`create_file`).  Some is never re-used (such 
+        as that of text attributes) and a file written by an older 
+        version re-uses none of it.  So the file is copied 
+        (see :func:`repack`) once more entries have been written 
+        again than there are entries in the file.
+        
+        :param str hdf_file: name of NeXus/HDF5 file to be updated
+        :param [int] scanlist: list of scan numbers to be read
+        :returns: list of the scan numbers written
+        """
+        scan_list = scan_list or []
+        if not os.path.exists(hdf_file):
+            self.save(hdf_file, scan_list)
+            return list(scan_list)
+
+        last_scan = str(self.spec.getLastScanNumber())
+        written = []
+        root = h5py.File(hdf_file, "a")
+        try:
+            rewritten = int(root.attrs.get(REWRITTEN_ATTRIBUTE, 0))
+            eznx.addAttributes(root, **self.root_attributes())
+            for key in scan_list:
+                name = 'S'+str(key)
+                scan = self.spec.getScan(key)
+                if name in root:
+                    if self.entry_is_current(root[name], scan, str(scan.scanNum) == last_scan):
+                        continue
+                    del root[name]      # free space, see create_file()
+                    rewritten += 1
+                self.save_entry(root, key, scan)
+                written.append(key)
+            default = root.attrs.get('default')
+            if (default is None or default not in root) and len(scan_list) > 0:
+                eznx.addAttributes(root, default='S'+str(scan_list[0]))
+            compact = rewritten > len(root)
+            eznx.addAttributes(root, **{REWRITTEN_ATTRIBUTE: rewritten})
+        finally:
+            root.close()    # be CERTAIN to close the file
+        if compact:
+            repack(hdf_file)
+        return written
+
+    def scan_extent(self, scan):
+        """*internal*: (offset, bytes) of the scan in the SPEC data file (offset may be None)"""
+        block = scan._block
+        if block is None:
+            return None, len(scan.raw)
+        return block.offset, block.length
+
+    def entry_is_current(self, nxentry, scan, is_last_scan):
+        """*internal*: was this NXentry written from the same scan content?"""
+        length = nxentry.attrs.get('SPEC_scan_bytes')
+        if length is None:
+            # written before the extent was recorded
+            return not is_last_scan
+        offset, current = self.scan_extent(scan)
+        return length == current and nxentry.attrs.get('SPEC_scan_offset') == offset
+
+    def save_entry(self, root, key, scan):
+        """*internal*: save one scan in a new NXentry group"""
+        offset, length = self.scan_extent(scan)
+        extent = dict(SPEC_scan_bytes=length)
+        if offset is not None:
+            extent['SPEC_scan_offset'] = offset
+        nxentry = eznx.makeGroup(root, 'S'+str(key), 'NXentry', **extent)
+        eznx.makeDataset(
+            nxentry, 
+            'definition', 
+            'NXspecdata', 
+            description='NeXus application definition (status pending)')
+        self.save_scan(nxentry, scan)
+        if 'data' not in nxentry:
+            # NXentry MUST have a NXdata group with data for default plot
+            nxdata = eznx.makeGroup(
+                nxentry, 
+                'data', 
+                'NXdata',
+                signal='no_y_data',
+                axes='no_x_data',
+                no_x_data_indices=[0,],
+                )
+            eznx.makeDataset(
+                nxdata, 
+                "no_x_data", 
+                (0, 1), 
+                units='none',
+                long_name='no data points in this scan')
+            eznx.makeDataset(
+                nxdata, 
+                "no_y_data", 
+                (0, 1), 
+                units='none',
+                long_name='no data points in this scan')
+        return nxentry
+    
     def root_attributes(self):
         """*internal*: returns the attributes to be written to the root element as a dict"""
         from spec2nexus._version import get_versions
@@ -300,7 +452,7 @@ class Writer(object):
             for key, spectrum in sorted(scan.data[spec.MCA_DATA_KEY].items()):
                 num_channels = len(spectrum[0])
                 data_shape.append(num_channels)
-                mca = np.array(spectrum)
+                mca = np.asarray(spectrum)
                 data = utils.reshape_data(mca, data_shape)
                 channels = range(1, num_channels+1)
                 ds_name = '_' + key + '_'
@@ -312,4 +464,212 @@ class Writer(object):
     def write_ds(self, group, label, data, **attr):
         """*internal*: writes a dataset to the HDF5 file, records the SPEC name as an attribute"""
         clean_name = utils.clean_name(label)
-        eznx.write_dataset(group, clean_name, data, spec_name=label, **attr)
+        eznx.write_dataset(group, clean_name, data, _storage=self.storage, spec_name=label, **attr)
+
+
+class StreamWriter(Writer):
+    
+    """
+    writes a growing SPEC data file to a NeXus HDF5 file, while it grows
+    
+    Scans that are complete are written as by :class:`Writer`.  
+    The data of the last scan (still acquiring) are written to 
+    extendable datasets (chunked, unlimited length) with the 
+    names and layout of :meth:`~Writer.oneD` and 
+    :meth:`~Writer.mca_spectra`, one for each ``#L`` column 
+    and MCA spectrum.  :meth:`poll` reads the new content of the 
+    SPEC data file (:meth:`~spec2nexus.spec.SpecDataFile.refresh`) 
+    and appends the new data rows.
+    
+    The HDF5 file is written in SWMR (single writer, multiple reader) 
+    mode so readers, such as::
+    
+        h5py.File(hdf_file, "r", libver="latest", swmr=True)
+    
+    never see a corrupt file (call ``refresh()`` on a dataset to 
+    see its new rows).  HDF5 can not create groups or datasets in 
+    SWMR mode: when the next scan starts, SWMR mode is stopped to 
+    complete the previous scan (written again, as by :class:`Writer`)
+    and create the next, then started again.  Readers should open 
+    the file again then (such as when a new **NXentry** appears).
+    
+    :param obj spec_data: instance of :class:`~spec2nexus.spec.SpecDataFile`
+    :param str hdf_file: name of NeXus/HDF5 file to be written (replaced)
+    :param dict kwargs: chunking & compression options of :class:`Writer`
+    
+    EXAMPLE::
+    
+        sdf = spec.SpecDataFile("growing.dat")
+        with writer.StreamWriter(sdf, "growing.hdf5") as live:
+            while acquiring:
+                live.poll()
+                time.sleep(1)
+
+    .. autosummary::
+    
+        ~open
+        ~poll
+        ~close
+
+    """
+
+    def __init__(self, spec_data, hdf_file, **kwargs):
+        Writer.__init__(self, spec_data, **kwargs)
+        self.hdf_file = hdf_file
+        self.root = None
+        self._live_scan_ = None     # scan still acquiring
+        self._live_path_ = None     # HDF5 path of its NXdata group
+        self._live_ = {}            # extendable dataset name: (MCA key or None, label)
+    
+    def __enter__(self):
+        self.open()
+        return self
+    
+    def __exit__(self, *args):
+        self.close()
+
+    def open(self):
+        """write the NeXus file with the scans (so far), start SWMR mode"""
+        self.root = create_file(self.hdf_file, libver="latest")
+        self._synchronize_()
+        self.root.swmr_mode = True
+
+    def poll(self):
+        """
+        write any new content of the SPEC data file, return True if written
+        
+        New data rows of the live scan are appended (in SWMR mode).
+        A new scan, or any other change, is written after SWMR mode is
+        stopped, then started again.
+        """
+        if not self.spec.update_available:
+            return False
+        self.spec.refresh()
+        if self._live_scan_ is not None:
+            scan = self.spec.getScan(self.spec.getLastScanNumber())
+            if scan.scanNum == self._live_scan_.scanNum and self._append_(scan):
+                return True
+        self.root.close()
+        self.root = h5py.File(self.hdf_file, "a", libver="latest")
+        self._synchronize_()
+        self.root.swmr_mode = True
+        return True
+
+    def close(self, finalize=True):
+        """
+        close the NeXus file
+        
+        :param bool finalize: write the live scan again, as by 
+            :class:`Writer` (such as a mesh scan in 2-D), 
+            not in SWMR mode (default: True)
+        """
+        if self.root is None:
+            return
+        self.root.close()
+        self.root = None
+        live_scan = self._live_scan_
+        self._live_scan_, self._live_path_, self._live_ = None, None, {}
+        if finalize and live_scan is not None:
+            scan = self.spec.getScan(live_scan.scanNum)
+            root = h5py.File(self.hdf_file, "a", libver="latest")
+            try:
+                name = 'S' + str(scan.scanNum)
+                if name in root:
+                    del root[name]      # free space, see create_file()
+                self.save_entry(root, scan.scanNum, scan)
+            finally:
+                root.close()    # be CERTAIN to close the file
+
+    def _synchronize_(self):
+        """*internal*: (not in SWMR mode) write new & changed scans, start the live scan"""
+        root = self.root
+        eznx.addAttributes(root, **self.root_attributes())
+        scan_list = self.spec.getScanNumbers()
+        if len(scan_list) == 0:
+            return
+        last_scan = str(self.spec.getLastScanNumber())
+        previous = None     # written as the live scan, write it again
+        if self._live_scan_ is not None:
+            previous = str(self._live_scan_.scanNum)
+        self._live_scan_, self._live_path_, self._live_ = None, None, {}
+        for key in scan_list:
+            name = 'S' + str(key)
+            scan = self.spec.getScan(key)
+            live = str(key) == last_scan
+            if name in root:
+                current = str(key) != previous and self.entry_is_current(root[name], scan, False)
+                if not live and current:
+                    continue
+                del root[name]      # free space, see create_file()
+            if live:
+                self._live_scan_ = scan
+            self.save_entry(root, key, scan)
+        default = root.attrs.get('default')
+        if default is None or default not in root:
+            eznx.addAttributes(root, default='S' + str(scan_list[0]))
+
+    def _append_(self, scan):
+        """*internal*: (SWMR mode) append new rows of the live scan, False if not possible"""
+        scan.interpret()
+        if self._live_path_ is None or scan.L != self._live_scan_.L:
+            return False
+        mca = scan.data.get(spec.MCA_DATA_KEY, {})
+        if set(mca) != set(k for k, _ in self._live_.values() if k is not None):
+            return False    # MCA spectra started
+        nxdata = self.root[self._live_path_]
+        updates = []
+        for name, (key, label) in self._live_.items():
+            if key is None:
+                values = scan.data.get(label, [])
+            else:
+                values = mca.get(key, [])
+            values = np.asarray(values)
+            dataset = nxdata[name]
+            if len(values) < dataset.shape[0] or values.shape[1:] != dataset.shape[1:]:
+                return False    # not just new rows
+            updates.append((dataset, values))
+        for dataset, values in updates:
+            rows = dataset.shape[0]
+            if len(values) > rows:
+                dataset.resize((len(values),) + dataset.shape[1:])
+                dataset[rows:] = values[rows:]
+                dataset.flush()
+        self._live_scan_ = scan
+        return True
+
+    def save_data(self, nxdata, scan):
+        """*internal*: store the scan data, extendable for the live scan"""
+        if scan is not self._live_scan_:
+            return Writer.save_data(self, nxdata, scan)
+        # as 1-D columns while acquiring (such as a mesh scan)
+        self._live_path_ = nxdata.name
+        signal, axis = self.oneD(nxdata, scan)
+        eznx.addAttributes(nxdata, signal=signal, axes=axis, **{axis+'_indices': [0,]})
+
+    def write_ds(self, group, label, data, **attr):
+        """*internal*: writes a dataset, extendable for live scan data"""
+        key = None
+        if self._live_path_ is not None and group.name == self._live_path_:
+            for mca_key in self._live_scan_.data.get(spec.MCA_DATA_KEY, {}):
+                if label == '_' + mca_key + '_':
+                    key = mca_key
+            if key is None and label not in self._live_scan_.L:
+                return Writer.write_ds(self, group, label, data, **attr)
+        else:
+            return Writer.write_ds(self, group, label, data, **attr)
+
+        clean_name = utils.clean_name(label)
+        values = np.asarray(data)
+        if key is None:
+            values = values.astype(float)
+        shape = values.shape
+        options = dict(self.storage or {})
+        options['chunks'] = eznx.chunk_shape(
+            (STREAM_CHUNK_ROWS,) + shape[1:], values.dtype.itemsize)
+        options['maxshape'] = (None,) + shape[1:]
+        if clean_name in group:
+            del group[clean_name]
+        dataset = group.create_dataset(clean_name, data=values, **options)
+        eznx.addAttributes(dataset, spec_name=label, **attr)
+        self._live_[clean_name] = (key, label)
+        return dataset
@@ -25,6 +25,7 @@ if _path not in sys.path:
 
 def suite(*args, **kw):
     from tests import data_03_06_JanTest
+    from tests import test_compressed
     from tests import test_extractSpecScan
     from tests import test_diffractometers
     from tests import test_eznx
@@ -36,6 +37,7 @@ def suite(*args, **kw):
     from tests import test_spec
     from tests import test_specplot
     from tests import test_specplot_gallery
+    from tests import test_synthetic
     from tests import test_utils
     from tests import test_uxml
     from tests import test_writer
@@ -49,6 +51,7 @@ def suite(*args, **kw):
 
     test_list = [
         data_03_06_JanTest,
+        test_compressed,
         test_diffractometers,
         test_extractSpecScan,
         test_eznx,
@@ -60,6 +63,7 @@ def suite(*args, **kw):
         test_spec,
         test_specplot,
         test_specplot_gallery,
+        test_synthetic,
         test_utils,
         test_uxml,
         test_writer,
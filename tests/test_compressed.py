@@ -0,0 +1,185 @@
+'''
+unit tests for the compressed module
+'''
+
+#-----------------------------------------------------------------------------
+# :author:    Pete R. Jemian
+# :email:     prjemian@gmail.com
+# :copyright: (c) 2014-2019, Pete R. Jemian
+#
+# Distributed under the terms of the Creative Commons Attribution 4.0 International Public License.
+#
+# The full license is in the file LICENSE.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+import bz2
+import gzip
+import io
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+_test_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+_path = os.path.abspath(os.path.join(_test_path, 'src'))
+
+sys.path.insert(0, _path)
+sys.path.insert(0, _test_path)
+
+from spec2nexus import compressed, spec
+
+
+class TestCompressed(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # compress once (bzip2 & xz are slow)
+        cls.tempdir = tempfile.mkdtemp()
+        cls.fname = os.path.join(_path, 'spec2nexus', 'data', '33id_spec.dat')
+        with open(cls.fname, "rb") as fp:
+            cls.content = fp.read()
+        cls.files = {}
+        openers = dict(gzip=gzip.GzipFile, bz2=bz2.BZ2File)
+        if compressed.lzma is not None:
+            openers["xz"] = compressed.lzma.LZMAFile
+        for name, opener in openers.items():
+            cname = os.path.join(cls.tempdir, "33id_spec.dat." + name)
+            with opener(cname, "wb") as fp:
+                fp.write(cls.content)
+            cls.files[name] = cname
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tempdir, ignore_errors=True)
+
+    def test_compression_of(self):
+        self.assertIsNone(compressed.compression_of(self.fname))
+        for name, cname in self.files.items():
+            self.assertEqual(compressed.compression_of(cname), name)
+            with compressed.open_binary(cname, name) as fp:
+                self.assertEqual(fp.read(), self.content)
+
+    def test_spec_data_file(self):
+        ref = spec.SpecDataFile(self.fname)
+        for name, cname in self.files.items():
+            self.assertTrue(spec.is_spec_file(cname), name)
+            self.assertTrue(spec.is_spec_file_with_header(cname), name)
+            for indexed in (False, True):
+                sdf = spec.SpecDataFile(cname, indexed=indexed)
+                self.assertEqual(sdf.compression, name)
+                self.assertEqual(sdf._blocks_, ref._blocks_)
+                self.assertEqual(sdf.getScanNumbers(), ref.getScanNumbers())
+                scan = sdf.getScan(-1)
+                self.assertEqual(scan.raw, ref.getScan(-1).raw)
+                self.assertEqual(scan.positioner["DCM theta"], 12.747328)
+            scans = [
+                part
+                for part in spec.iter_scans(cname)
+                if isinstance(part, spec.SpecDataFileScan)]
+            self.assertEqual(len(scans), 106)
+            self.assertEqual(scans[42].raw, ref.getScan(43).raw)
+        self.assertFalse(spec.is_spec_file(os.path.join(self.tempdir, "none.gz")))
+
+    def test_gzip_seek_index(self):
+        cname = self.files["gzip"]
+        index = compressed.GzipSeekIndex(cname, spacing=4096)
+        with index.reader() as fp:
+            self.assertEqual(fp.read(100), self.content[:100])
+            fp.seek(5000)
+            self.assertEqual(fp.tell(), 5000)
+            self.assertEqual(fp.read(10 ** 7), self.content[5000:])
+        self.assertTrue(index.complete)
+        self.assertGreater(len(index.offsets), 2)
+        for offset in (0, 4095, 4096, 100000, len(self.content) - 10):
+            self.assertEqual(
+                index.read(offset, 5000),
+                self.content[offset:offset + 5000])
+
+        sdf = spec.SpecDataFile(cname, indexed=True, gzip_index=True)
+        self.assertTrue(sdf._gzip_index_.complete)
+        scan = sdf.getScan(50)
+        self.assertTrue(scan.raw.startswith("#S 50 "))
+        ref = spec.SpecDataFile(self.fname).getScan(50)
+        self.assertEqual(scan.data["I0"], ref.data["I0"])
+
+    def test_gzip_seek_points_saved(self):
+        # seek points in the index cache, used by another process
+        members = os.path.join(self.tempdir, "members.dat.gz")
+        with open(members, "wb") as fp:
+            for i in range(0, len(self.content), 50000):
+                part = io.BytesIO()
+                with gzip.GzipFile(fileobj=part, mode="wb") as gz:
+                    gz.write(self.content[i:i + 50000])
+                fp.write(part.getvalue())
+        files = [members]
+        if compressed._load_libz_() is not None:
+            files.append(self.files["gzip"])    # one member
+        ref = spec.SpecDataFile(self.fname)
+        spacing = compressed.GZIP_SEEK_SPACING
+        compressed.GZIP_SEEK_SPACING = 1 << 15
+        try:
+            for cname in files:
+                cache = os.path.join(self.tempdir, "cache")
+                sdf = spec.SpecDataFile(
+                    cname, indexed=True, gzip_index=True, index_cache=cache)
+                saved = sdf._gzip_index_.saved_points()
+                self.assertGreater(len(saved), 2)
+                if cname == members:
+                    self.assertEqual(  # starts of gzip members
+                        [len(point) for point in saved], [2] * len(saved))
+
+                pool = multiprocessing.Pool(1)
+                try:
+                    complete, started, raw = pool.apply(
+                        _read_scan_, (cname, cache, "100"))
+                finally:
+                    pool.close()
+                    pool.join()
+                self.assertTrue(complete)
+                self.assertEqual(raw, ref.getScan(100).raw)
+                # only from the nearest seek point before the scan
+                block = ref.getScan(100)._block
+                nearest = max(
+                    point[0] for point in saved if point[0] <= block.offset)
+                self.assertGreater(nearest, 0)
+                self.assertEqual(started, [nearest])
+        finally:
+            compressed.GZIP_SEEK_SPACING = spacing
+
+
+def _read_scan_(cname, cache, scan_number):
+    """
+    in a new process: (seek points known?, content offsets where
+    decompression started, text of the scan)
+    """
+    started = []
+    iter_content = compressed.GzipSeekIndex._iter_content_
+    def spy(index, point, record=False):
+        started.append(index.offsets[point])
+        return iter_content(index, point, record)
+    compressed.GzipSeekIndex._iter_content_ = spy
+    try:
+        sdf = spec.SpecDataFile(
+            cname, indexed=True, gzip_index=True, index_cache=cache)
+        complete = sdf._gzip_index_.complete
+        raw = sdf.getScan(scan_number).raw
+    finally:
+        compressed.GzipSeekIndex._iter_content_ = iter_content
+    return complete, started, raw
+
+
+def suite(*args, **kw):
+    test_suite = unittest.TestSuite()
+    test_list = [
+        TestCompressed,
+        ]
+    for test_case in test_list:
+        test_suite.addTest(unittest.makeSuite(test_case))
+    return test_suite
+
+
+if __name__ == "__main__":
+    runner=unittest.TextTestRunner()
+    runner.run(suite())
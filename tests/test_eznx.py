@@ -12,6 +12,7 @@ unit tests for the writer module
 # The full license is in the file LICENSE.txt, distributed with this software.
 #-----------------------------------------------------------------------------
 
+import array
 import h5py
 import numpy
 import os
@@ -204,6 +205,67 @@ class TestEznx(unittest.TestCase):
             expected = "unexpected 2-D data"
             self.assertTrue(received.startswith(expected))
 
+    def test_chunk_shape(self):
+        self.assertEqual(eznx.chunk_shape((10,), 8), (10,))
+        self.assertEqual(eznx.chunk_shape((900, 256), 8, 2**20), (450, 256))
+        self.assertEqual(eznx.chunk_shape((30, 30, 256), 8, 2**20), (15, 30, 256))
+        self.assertEqual(eznx.chunk_shape((4, 10**6), 8, 2**20), (1, 125000))
+        self.assertEqual(eznx.chunk_shape((0, 4), 8), (1, 4))
+
+    def test_storage_options(self):
+        self.assertIsNone(eznx.storage_options())
+        self.assertEqual(eznx.storage_options(chunks=True), dict(chunks=True))
+        self.assertEqual(
+            eznx.storage_options(compression="gzip", compression_level=6, shuffle=True),
+            dict(chunks=True, compression="gzip", compression_opts=6, shuffle=True))
+        self.assertRaises(ValueError, eznx.storage_options, compression="zip")
+        self.assertRaises(ValueError, eznx.storage_options, compression="lzf", compression_level=3)
+        self.assertRaises(ValueError, eznx.storage_options, compression="gzip", compression_level=10)
+
+        storage = eznx.storage_options(compression="gzip", shuffle=True)
+        root = eznx.makeFile('test.h5', creator='eznx')
+        eznx.write_dataset(root, "spectra", numpy.ones((50, 1024)), _storage=storage)
+        eznx.write_dataset(root, "small", [1, 2, 3], _storage=storage)
+        eznx.write_dataset(root, "text", "some text", _storage=storage)
+        root.close()
+
+        with h5py.File("test.h5", "r") as hp:
+            ds = hp["spectra"]
+            self.assertEqual(ds.chunks, (50, 1024))
+            self.assertEqual(ds.compression, "gzip")
+            self.assertTrue(ds.shuffle)
+            self.assertEqual(ds[()].sum(), 50 * 1024)
+            self.assertIsNone(hp["small"].chunks)
+            self.assertIsNone(hp["text"].compression)
+
+        # "storage" is an attribute name like any other
+        root = eznx.makeFile('test.h5', creator='eznx')
+        ds = eznx.makeDataset(root, "data", [1, 2, 3], storage="tape")
+        self.assertEqual(ds.attrs["storage"], "tape")
+        root.close()
+
+    def test_makeDataset_arrays(self):
+        root = eznx.makeFile('test.h5', creator='eznx')
+        eznx.makeDataset(root, "int16", numpy.arange(12, dtype="int16").reshape(3, 4))
+        eznx.makeDataset(root, "array", array.array("d", [1.5, 2.5]))
+        eznx.makeDataset(root, "buffer", memoryview(numpy.arange(4, dtype="uint8")))
+        eznx.makeDataset(root, "numbers", [1, 2, 3])
+        eznx.makeDataset(root, "scalar", numpy.float32(1.5))
+        eznx.makeDataset(root, "text", [u"caf\u00e9", "bar"])
+        root.close()
+
+        with h5py.File("test.h5", "r") as hp:
+            ds = hp["int16"]
+            self.assertEqual(ds.dtype, numpy.dtype("int16"))
+            self.assertEqual(ds.shape, (3, 4))
+            self.assertEqual(ds[2, 3], 11)
+            self.assertEqual(hp["array"].dtype, numpy.dtype("float64"))
+            self.assertEqual(hp["array"][()].tolist(), [1.5, 2.5])
+            self.assertEqual(hp["buffer"].dtype, numpy.dtype("uint8"))
+            self.assertEqual(hp["numbers"][()].tolist(), [1, 2, 3])
+            self.assertEqual(hp["scalar"].shape, (1,))
+            self.assertEqual(list(hp["text"][()]), [b"caf", b"bar"])
+
 
 def suite(*args, **kw):
     test_list = [
@@ -15,6 +15,7 @@ unit tests for the writer module
 import h5py
 import os
 import shutil
+import six
 import sys
 import tempfile
 import unittest
@@ -88,6 +89,44 @@ class TestExampleData_to_Nexus(unittest.TestCase):
                 self.assertNotEqual(nxdata, None, "NXentry group has NXdata group")
                 self.assertTrue(isinstance(nxdata, h5py.Group), default + " is HDF5 Group")
 
+    def test_jobs(self):
+        names = ["user6idd.dat", "APS_spec_data.dat"]
+        for fn in names:
+            shutil.copy2(os.path.join(self.data_path, fn), self.tempdir)
+        with open("not_spec.dat", "w") as fp:
+            fp.write("not a SPEC data file\n")
+        names += ["not_spec.dat", "missing.dat"]
+        sys.argv = [self.sys_argv0, "-f", "--quiet", "-j", "2"] + names
+
+        with self.assertRaises(SystemExit) as context:
+            nexus.main()
+        self.assertEqual(context.exception.code, 1)   # some files failed
+        for fn in names[:2]:
+            self.assertTrue(os.path.exists(os.path.splitext(fn)[0] + ".hdf5"))
+
+        failures = nexus.convert_files(names, nexus.get_user_parameters(), jobs=1)
+        self.assertEqual(failures, ["not_spec.dat", "missing.dat"])
+
+    def test_serial_failures(self):
+        names = ["not_spec.dat", "missing.dat", "user6idd.dat"]
+        shutil.copy2(os.path.join(self.data_path, names[-1]), self.tempdir)
+        with open("not_spec.dat", "w") as fp:
+            fp.write("not a SPEC data file\n")
+        sys.argv = [self.sys_argv0, "-f", "--quiet"] + names
+
+        stderr = sys.stderr
+        sys.stderr = six.StringIO()
+        try:
+            with self.assertRaises(SystemExit) as context:
+                nexus.main()
+            errors = sys.stderr.getvalue()
+        finally:
+            sys.stderr = stderr
+        self.assertEqual(context.exception.code, 1)   # some files failed
+        self.assertTrue(os.path.exists("user6idd.hdf5"))
+        self.assertIn("Traceback", errors)             # not only one line
+        self.assertIn("NotASpecDataFile", errors)
+
 
 def suite(*args, **kw):
     test_list = [
@@ -25,6 +25,7 @@ sys.path.insert(0, _test_path)
 from spec2nexus import spec
 from spec2nexus import plugin
 from spec2nexus import writer
+from spec2nexus.plugins import spec_common
 
 
 class TestPlugin(unittest.TestCase):
@@ -65,6 +66,55 @@ class TestPlugin(unittest.TestCase):
         for k, v in spec_data.items():
             self.assertEqual(k, self.manager.getKey(v))
 
+    def test_handlers_reused(self):
+        handler = self.manager.get_handler("#S")
+        self.assertIsInstance(handler, self.manager.get("#S"))
+        self.assertIs(self.manager.get_handler("#S"), handler)
+        self.assertIsNone(self.manager.get_handler("#not-a-key"))
+
+    def test_projection_keys(self):
+        self.assertIsNone(self.manager.get_projection_keys(None))
+        self.assertEqual(
+            self.manager.get_projection_keys(["#L"]), 
+            {"#L", "#N"})       # #L requires #N
+        self.assertEqual(
+            self.manager.get_projection_keys(["G"]), 
+            self.manager.get_projection_keys(["#G0"]))
+        keys = self.manager.get_projection_keys(["data"])
+        self.assertIn(spec_common.SCAN_DATA_KEY, keys)
+        self.assertIn("#L", keys)
+        self.assertNotIn("#P\\d+", keys)
+        self.assertRaises(
+            ValueError, 
+            self.manager.get_projection_keys, ["not-an-attribute"])
+
+    def test_keys_matched_in_order(self):
+        class Numbered(plugin.ControlLineHandler):
+            key = r'#Z\d+'
+        class Any(plugin.ControlLineHandler):
+            key = r'#Z\w*'
+        class Repeated(plugin.ControlLineHandler):
+            key = r'#(Y)\1'
+        class Custom(plugin.ControlLineHandler):
+            key = 'custom'
+            def match_key(self, text):
+                return text.startswith('%')
+
+        manager = plugin.PluginManager()
+        for handler in (Numbered, Custom, Any, Repeated):
+            manager.registry[handler.key] = handler
+        self.assertEqual(manager.getKey("#Z12 text"), Numbered.key)
+        self.assertEqual(manager.getKey("#Z12 text"), Numbered.key)  # again
+        self.assertEqual(manager.getKey("#Zed text"), Any.key)
+        self.assertEqual(manager.getKey("#YY text"), Repeated.key)
+        self.assertEqual(manager.getKey("%1 text"), Custom.key)
+        self.assertIsNone(manager.getKey("#YZ text"))
+        self.assertIsNone(manager.getKey("#Z12"))      # no space
+        
+        # registry changed
+        del manager.registry[Numbered.key]
+        self.assertEqual(manager.getKey("#Z12 text"), Any.key)
+
 
 class TestCustomPlugin(unittest.TestCase):
     """test a custom plugin"""
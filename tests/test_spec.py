@@ -12,7 +12,13 @@ unit tests for the spec module
 # The full license is in the file LICENSE.txt, distributed with this software.
 #-----------------------------------------------------------------------------
 
+from collections import OrderedDict
+import copy
+import itertools
+import json
+import numpy
 import os
+import pickle
 import shutil
 import sys
 import tempfile
@@ -25,7 +31,7 @@ _path = os.path.abspath(os.path.join(_test_path, 'src'))
 sys.path.insert(0, _path)
 sys.path.insert(0, _test_path)
 
-from spec2nexus import spec, utils
+from spec2nexus import plugin, spec, utils
 
 
 # interval between file update and mtime reading
@@ -51,6 +57,39 @@ class Test(unittest.TestCase):
         self.assertTrue( spec.is_spec_file_with_header(self.abs_data_fname('APS_spec_data.dat')))
         self.assertFalse(spec.is_spec_file_with_header(self.abs_data_fname('spec_from_spock.spc')))
     
+    def test_isSpecFileProbe(self):
+        tempdir = tempfile.mkdtemp()
+        try:
+            fname = os.path.join(tempdir, "probe.dat")
+            with open(fname, "wb") as fp:
+                fp.write(b"#F probe.dat\n#S\x00 binary\n")
+            self.assertFalse(spec.is_spec_file(fname))
+
+            # the answer is remembered for this size & mtime
+            with open(fname, "wb") as fp:
+                fp.write(b"#F probe.dat\n#E 1\n#S 1 ascan\n#L a  b\n1 2\n")
+            self.assertTrue(spec.is_spec_file(fname))
+            key = os.path.abspath(fname)
+            signature, answer = spec._spec_files_[key]
+            self.assertTrue(answer)
+            spec._spec_files_[key] = (signature, False)
+            self.assertFalse(spec.is_spec_file(fname))
+            del spec._spec_files_[key]
+
+            # look for #S only in the first bytes
+            with open(fname, "wb") as fp:
+                fp.write(b"#C comment\n" * 10000 + b"#S 1 ascan\n")
+            self.assertTrue(spec.is_spec_file(fname))
+            del spec._spec_files_[key]
+            probe_bytes = spec.SPEC_FILE_PROBE_BYTES
+            spec.SPEC_FILE_PROBE_BYTES = 1000
+            try:
+                self.assertFalse(spec.is_spec_file(fname))
+            finally:
+                spec.SPEC_FILE_PROBE_BYTES = probe_bytes
+        finally:
+            shutil.rmtree(tempdir, ignore_errors=True)
+
     def is_spec_file(self, fname):
         return spec.is_spec_file(self.abs_data_fname(fname))
         
@@ -366,6 +405,288 @@ class Test(unittest.TestCase):
         sdf = spec.SpecDataFile(None)
         self.assertEqual(str(sdf), 'None')
 
+    def test_lazy_attributes(self):
+        sdf = spec.SpecDataFile(self.abs_data_fname('33bm_spec.dat'))
+        scan = sdf.getScan(1)
+        self.assertFalse(scan.__interpreted__)
+        self.assertEqual(scan.scanNum, '1')         # not lazy
+        self.assertFalse(scan.__interpreted__)
+        self.assertNotIn('L', vars(scan))
+        self.assertGreater(len(scan.L), 0)          # lazy
+        self.assertTrue(scan.__interpreted__)
+        self.assertIn('L', vars(scan))
+        self.assertIsNone(scan.data_array)          # default value
+        self.assertFalse(hasattr(scan, 'not_an_attribute'))
+
+    def test_data_rows_to_array(self):
+        from spec2nexus.plugins import spec_common
+        rows = [
+            "1 2 3",
+            "4 5",              # incomplete
+            "6 7 8",
+            "9 ten 11",         # bad
+            "1e3 -inf nan",
+            ]
+        table = spec_common.data_rows_to_array(rows, 3)
+        self.assertEqual(table.shape, (3, 3))
+        self.assertEqual(table[:, 0].tolist(), [1, 6, 1000])
+        self.assertEqual(table[1].tolist(), [6, 7, 8])
+        self.assertEqual(spec_common.data_rows_to_array(["4 5"], 3).shape, (0, 3))
+
+    def test_columnar(self):
+        fname = self.abs_data_fname('33id_spec.dat')
+        reference = spec.SpecDataFile(fname).getScan(1)
+        scan = spec.SpecDataFile(fname, columnar=True).getScan(1)
+        self.assertIsNone(reference.data_array)
+        self.assertEqual(scan.data_array.shape, (len(scan.L), len(scan.data["I0"])))
+        self.assertTrue(scan.data_array.flags["C_CONTIGUOUS"])
+        self.assertEqual(sorted(scan.data.keys()), sorted(reference.data.keys()))
+        for col, label in enumerate(scan.L):
+            self.assertIs(scan.data[label].base, scan.data_array)
+            self.assertEqual(scan.data[label].tolist(), reference.data[label])
+
+    def test_mca_spectra(self):
+        from spec2nexus.plugins import spec_common
+        scan = spec.SpecDataFile(self.abs_data_fname('33id_spec.dat')).getScan(1)
+        spectra = scan.data[spec.MCA_DATA_KEY]["mca"]
+        self.assertEqual(spectra.shape, (41, 91))     # #@CHANN 1201 1110 1200 1
+        self.assertEqual(spectra.shape[0], len(scan.data["I0"]))
+
+        spectra = spec_common.mca_spectra_to_array(["1 2 3", "4 5 6"])
+        self.assertEqual(spectra.tolist(), [[1, 2, 3], [4, 5, 6]])
+        spectra = spec_common.mca_spectra_to_array(["1 2 3", "4 5"])
+        self.assertEqual(spectra, [[1, 2, 3], [4, 5]])
+        lines = ["@A 1 2\\", "3\\", "4", "5 6"]
+        self.assertEqual(
+            spec_common.join_continued_lines(lines),
+            ["@A 1 2 3 4", "5 6"])
+
+    def test_interpret_all(self):
+        fname = self.abs_data_fname('33id_spec.dat')
+        for columnar in (False, True):
+            reference = spec.SpecDataFile(fname, columnar=columnar)
+            sdf = spec.SpecDataFile(fname, columnar=columnar)
+            sdf.interpret_all(workers=2)
+            for key, scan in sdf.scans.items():
+                self.assertTrue(scan.__interpreted__)
+                ref = reference.getScan(key)
+                self.assertEqual(scan.L, ref.L)
+                self.assertEqual(scan.positioner, ref.positioner)
+                for label in ref.L:
+                    self.assertEqual(
+                        numpy.asarray(scan.data[label]).tolist(),
+                        numpy.asarray(ref.data[label]).tolist())
+                    if columnar:
+                        self.assertTrue(numpy.shares_memory(
+                            scan.data[label], scan.data_array))
+
+        sdf = spec.SpecDataFile(fname)
+        sdf.interpret_all(workers=1, scan_list=[1])
+        self.assertTrue(sdf.getScan(1).__interpreted__)
+        self.assertFalse(sdf.scans["2"].__interpreted__)
+
+    def test_interpret_all_in_workers(self):
+        # each scan is interpreted by a worker process, not here again
+        fname = self.abs_data_fname('33id_spec.dat')
+        manager = plugin.get_plugin_manager()
+        received = []
+        _set_scan_state_ = spec._set_scan_state_
+        def spy(scan, state):
+            received.append(scan.scanNum)
+            _set_scan_state_(scan, state)
+        spec._set_scan_state_ = spy
+        try:
+            sdf = spec.SpecDataFile(fname)
+            sdf.interpret_all(workers=2)
+        finally:
+            spec._set_scan_state_ = _set_scan_state_
+        self.assertEqual(sorted(received), sorted(sdf.getScanNumbers()))
+
+        # handler methods are those of this process
+        for scan in sdf.scans.values():
+            for registry in (scan.h5writers, scan.postprocessors):
+                for func in registry.values():
+                    handler = getattr(func, "__self__", None)
+                    if hasattr(handler, "key"):
+                        self.assertIs(handler, manager.get_handler(handler.key))
+        scan = sdf.getScan(1)
+        self.assertIs(scan.h5writers, sdf.getScan(2).h5writers)    # shared
+
+    def test_projection(self):
+        fname = self.abs_data_fname('33id_spec.dat')
+        reference = spec.SpecDataFile(fname).getScan(1)
+        reference.interpret()
+
+        sdf = spec.SpecDataFile(fname, projection=['L', 'data'])
+        scan = sdf.getScan(1)
+        self.assertEqual(scan.L, reference.L)
+        self.assertEqual(sorted(scan.data), sorted(reference.data))
+        self.assertFalse(scan.__interpreted__)
+        self.assertNotIn('G', scan.__dict__)        # not in the projection
+        self.assertNotIn('positioner', scan.__dict__)
+
+        scan.interpret(projection=['G'])            # more lines
+        self.assertEqual(scan.__dict__['G'], reference.G)
+        self.assertNotIn('positioner', scan.__dict__)
+        self.assertEqual(sorted(scan.data), sorted(reference.data))
+        self.assertFalse(scan.__interpreted__)
+
+        scan.interpret()                            # all lines
+        self.assertTrue(scan.__interpreted__)
+        self.assertEqual(scan.positioner, reference.positioner)
+        self.assertEqual(scan.comments, reference.comments)
+        self.assertEqual(sorted(scan.h5writers), sorted(reference.h5writers))
+
+        self.assertRaises(
+            ValueError, spec.SpecDataFile, fname, projection=['no such thing'])
+
+    def test_projection_completed(self):
+        fname = self.abs_data_fname('33bm_spec.dat')
+        reference = spec.SpecDataFile(fname)
+        attributes = ('L', 'data', 'G', 'positioner', 'comments', 'M', 'T')
+        sdf = spec.SpecDataFile(fname, projection=['L', 'data'])
+        for scan_number in sdf.getScanNumbers():
+            scan = sdf.getScan(scan_number)
+            expected = reference.getScan(scan_number)
+            self.assertEqual(scan.L, expected.L)
+            self.assertFalse(scan.__interpreted__)
+            # outside of the projection: interpret all of the scan
+            for attr in attributes:
+                self.assertEqual(getattr(scan, attr), getattr(expected, attr))
+            self.assertTrue(scan.__interpreted__)
+            self.assertEqual(
+                sorted(scan.h5writers), sorted(expected.h5writers))
+
+    def test_max_interpreted(self):
+        fname = self.abs_data_fname('33bm_spec.dat')
+        reference = spec.SpecDataFile(fname)
+        for indexed in (False, True):
+            sdf = spec.SpecDataFile(fname, indexed=indexed, max_interpreted=2)
+            for scan_number in sdf.getScanNumbers():
+                scan = sdf.getScan(scan_number)
+                self.assertEqual(
+                    scan.data, reference.getScan(scan_number).data)
+            interpreted = [
+                scan.scanNum 
+                for scan in sdf.scans.values() 
+                if scan.__interpreted__]
+            self.assertEqual(interpreted, sdf.getScanNumbers()[-2:])
+
+            # interpreted again, when used again
+            scan = sdf.getScan(1)
+            self.assertFalse(scan.__interpreted__)
+            self.assertNotIn("data", scan.__dict__)
+            self.assertEqual(scan.data, reference.getScan(1).data)
+            self.assertEqual(scan.L, reference.getScan(1).L)
+            self.assertTrue(scan.__interpreted__)
+
+    def test_compact_scans(self):
+        sdf = spec.SpecDataFile(self.abs_data_fname('33bm_spec.dat'))
+        first, second = sdf.getScan(1), sdf.getScan(2)
+        self.assertEqual(vars(first), {})   # nothing from plugins yet
+        self.assertEqual(first.S, "1  ascan  th 19.022 19.222  60 -20000")
+        self.assertIs(first.h5writers, second.h5writers)
+
+        first.interpret()
+        second.interpret()
+        self.assertIn("data", vars(first))
+        self.assertIs(first.h5writers, second.h5writers)    # shared
+        self.assertIs(first.postprocessors, second.postprocessors)
+        self.assertIsNot(first.data, second.data)
+        self.assertIsNot(first.comments, second.comments)
+        self.assertEqual(first.get_interpreter_comments(), [])
+
+    def test_shared_label_schema(self):
+        from spec2nexus.plugins.spec_common import LabelledValues
+        from spec2nexus.plugins.unicat import _number_or_text_
+        sdf = spec.SpecDataFile(self.abs_data_fname('33bm_spec.dat'))
+        first, second = sdf.getScan(1), sdf.getScan(2)
+        self.assertIsInstance(first.positioner, LabelledValues)
+        self.assertIs(first.positioner.schema, second.positioner.schema)
+        self.assertEqual(len(first.positioner._vector), len(first.positioner))
+        self.assertEqual(
+            list(first.positioner),
+            list(itertools.chain.from_iterable(first.header.O)))
+        self.assertEqual(first.positioner["theta"], 19.122)
+        self.assertIsInstance(first.positioner["theta"], float)
+        self.assertNotIn("no_such_motor", first.positioner)
+        self.assertIsNone(first.positioner.get("no_such_motor"))
+        self.assertEqual(first.positioner, dict(first.positioner.items()))
+
+        # same content as the dictionary it replaces
+        expected = OrderedDict()
+        for labels, values in zip(first.header.O, first.P):
+            for mne, val in zip(labels, values):
+                expected[mne] = float(val)
+        self.assertEqual(dict(first.positioner), expected)
+        self.assertEqual(list(first.positioner.keys()), list(expected.keys()))
+        self.assertEqual(list(first.positioner.values()), list(expected.values()))
+        self.assertEqual(list(first.positioner.items()), list(expected.items()))
+        # changed like a dictionary, the first change copies it
+        positioner = first.positioner
+        schema = positioner.schema
+        other = second.positioner["theta"]
+        positioner["theta"] = 0.0
+        positioner.update(new_motor=1.5)
+        del positioner["chi"]
+        self.assertEqual(positioner["theta"], 0.0)
+        self.assertEqual(positioner["new_motor"], 1.5)
+        self.assertNotIn("chi", positioner)
+        self.assertEqual(len(positioner), len(expected))    # +1 -1
+        self.assertIs(positioner.schema, schema)    # not changed
+        self.assertEqual(second.positioner["theta"], other)   # not changed
+        self.assertIsInstance(positioner.copy(), dict)
+        self.assertEqual(
+            json.loads(json.dumps(positioner.copy())), dict(positioner))
+        self.assertEqual(pickle.loads(pickle.dumps(positioner)), positioner)
+        duplicate = copy.copy(positioner)
+        duplicate["theta"] = 1.0
+        self.assertEqual(positioner["theta"], 0.0)
+
+        # UNICAT metadata
+        self.assertIsInstance(first.metadata, LabelledValues)
+        expected = OrderedDict()    # repeated labels: last value wins
+        for labels, values in zip(first.header.H, first.V):
+            for key, val in zip(labels, values):
+                expected[key] = _number_or_text_(val)
+        self.assertEqual(dict(first.metadata), expected)
+        self.assertEqual(list(first.metadata.keys()), list(expected.keys()))
+        self.assertEqual(list(first.metadata.values()), list(expected.values()))
+
+        copied = pickle.loads(pickle.dumps(first.positioner))
+        self.assertIs(copied.schema, first.positioner.schema)
+        self.assertEqual(copied, first.positioner)
+
+    def test_iter_scans(self):
+        fname = self.abs_data_fname('33id_spec.dat')
+        sdf = spec.SpecDataFile(fname)
+        for chunk_size in (5, 4096):
+            parts = list(spec.iter_scans(fname, chunk_size=chunk_size))
+            self.assertIsInstance(parts[0], spec.SpecDataFileHeader)
+            self.assertEqual(parts[0].raw, sdf.headers[0].raw)
+            scans = parts[1:]
+            self.assertEqual(
+                [scan.scanNum for scan in scans], list(sdf.scans.keys()))
+            for scan in scans:
+                self.assertIsInstance(scan, spec.SpecDataFileScan)
+                self.assertIs(scan.header, parts[0])
+                self.assertEqual(scan.raw, sdf.getScan(scan.scanNum).raw)
+        scan = scans[-1]
+        self.assertEqual(scan.positioner["DCM theta"], 12.747328)
+        self.assertEqual(scan.data["I0"], sdf.getScan(-1).data["I0"])
+        self.assertIsNone(scan.parent.scans[scan.scanNum])  # not kept
+        self.assertEqual(scan.parent._chronology_, [])      # nor its date
+
+        # start with scan 105
+        block = [b for b in sdf._blocks_ if b.first_line.startswith("#S 105 ")][0]
+        parts = list(spec.iter_scans(fname, start_offset=block.offset))
+        self.assertEqual([scan.scanNum for scan in parts], ["105", "106"])
+
+        with self.assertRaises(spec.SpecDataFileNotFound):
+            next(spec.iter_scans('cannot_find_this_file'))
+        with self.assertRaises(spec.NotASpecDataFile):
+            next(spec.iter_scans(__file__))
+
 
 class TestFileUpdate(unittest.TestCase):
 
@@ -425,12 +746,255 @@ class TestFileUpdate(unittest.TestCase):
         self.assertEqual(scan_number, None)
         self.assertEqual(len(sdf.getScanNumbers()), 5)
 
+    def test_refresh_tail(self):
+        for indexed in (False, True):
+            shutil.copy(
+                os.path.join(_test_path, "tests", "data", "refresh1.txt"), 
+                self.data_file.name)
+            sdf = spec.SpecDataFile(self.data_file.name, indexed=indexed)
+            self.assertEqual(len(sdf.getScan(3).data["ar"]), 3)
+            tail = sdf._blocks_[-1]
+            self.assertEqual(tail.key, "#S")
+            self.assertTrue(tail.first_line.startswith("#S 3 "))
+            scan1 = sdf.getScan(1)
+    
+            # update the file: more data for scan 3, then scans 4 & 5
+            self.addMoreScans()
+            time.sleep(SHORT_WAIT)
+    
+            starts = []
+            index_file = sdf.index_file
+            def spy(start=0):
+                starts.append(start)
+                return index_file(start=start)
+            sdf.index_file = spy
+            self.assertEqual(sdf.refresh(), "3")
+            self.assertEqual(starts, [tail.offset])
+            self.assertEqual(len(sdf.getScanNumbers()), 5)
+            self.assertEqual(sdf.last_scan, "5")
+            self.assertIs(sdf.getScan(1), scan1)   # not parsed again
+    
+            reference = spec.SpecDataFile(self.data_file.name)
+            for key in reference.getScanNumbers():
+                self.assertEqual(sdf.getScan(key).raw, reference.getScan(key).raw)
+            self.assertEqual(len(sdf.getScan(3).data["ar"]), 9)
+
+    def test_read_again(self):
+        for indexed in (False, True):
+            sdf = spec.SpecDataFile(self.data_file.name, indexed=indexed)
+            scans = list(sdf.scans.values())
+            sdf.refresh(tail=False)     # all content was read before
+            self.assertEqual(list(sdf.scans.values()), scans)
+
+    def test_same_scan_twice(self):
+        with open(self.data_file.name, "r") as fp:
+            text = fp.read()
+        scan_2 = text[text.index("#S 2 "):text.index("#S 3 ")]
+        with open(self.data_file.name, "a") as fp:
+            fp.write("\n" + scan_2)
+        sdf = spec.SpecDataFile(self.data_file.name)
+        self.assertEqual(sdf.getScanNumbers(), "1 2 2.1 3".split())
+        self.assertEqual(sdf.getScan("2.1").raw.strip(), scan_2.strip())
+
+
+class TestIndexedFile(unittest.TestCase):
+
+    def abs_data_fname(self, fname):
+        return os.path.join(_path, 'spec2nexus', 'data', fname)
+
+    def test_index_matches_dissect(self):
+        for fname in ('33bm_spec.dat', 'CdSe', 'lmn40.spe'):
+            sdf = spec.SpecDataFile(self.abs_data_fname(fname))
+            blocks = sdf.index_file()
+            self.assertEqual(
+                [sdf.read_block(b) for b in blocks],
+                sdf.dissect_file(),
+                fname)
+            self.assertEqual(blocks[0].key, "#F")
+            self.assertEqual(
+                len([b for b in blocks if b.key == "#S"]),
+                len(sdf.scans),
+                fname)
+
+    def test_scan_raw_read_on_demand(self):
+        fname = self.abs_data_fname('33id_spec.dat')
+        sdf = spec.SpecDataFile(fname, indexed=True)
+        reference = spec.SpecDataFile(fname)
+        self.assertEqual(len(sdf.scans), 106)
+        self.assertEqual(sdf.last_scan, reference.last_scan)
+        for scan in sdf.scans.values():
+            self.assertIsNone(scan._raw)
+            self.assertNotEqual(scan.date, '')
+
+        scan = sdf.getScan(22)
+        self.assertIsNone(scan._raw)
+        self.assertEqual(scan.scanCmd, reference.getScan(22).scanCmd)
+        self.assertEqual(len(scan.data['I0']), len(reference.getScan(22).data['I0']))
+        self.assertEqual(scan.raw, reference.getScan(22).raw)
+        self.assertIsNone(sdf.getScan(21)._raw)
+
+    def test_line_endings(self):
+        with open(self.abs_data_fname('33bm_spec.dat'), 'rb') as fp:
+            text = fp.read().replace(b'\r\n', b'\n')
+        reference = spec.SpecDataFile(self.abs_data_fname('33bm_spec.dat'))
+        tempdir = tempfile.mkdtemp()
+        try:
+            for eol in (b'\r', b'\r\n'):
+                fname = os.path.join(tempdir, 'eol.dat')
+                with open(fname, 'wb') as fp:
+                    fp.write(text.replace(b'\n', eol))
+                self.assertTrue(spec.is_spec_file(fname))
+                sdf = spec.SpecDataFile(fname)
+                self.assertEqual(
+                    [sdf.read_block(b) for b in sdf.index_file()],
+                    reference.dissect_file())
+                self.assertEqual(sdf.getScanNumbers(), reference.getScanNumbers())
+                self.assertEqual(sdf.getScan(1).date, reference.getScan(1).date)
+        finally:
+            shutil.rmtree(tempdir, ignore_errors=True)
+
+    def test_chronological_order(self):
+        text = "\n".join([
+            "#F chrono.dat",
+            "#E 1500000000",
+            "#D Fri Jul 14 02:40:00 2017",
+            "",
+            "#S 1  ascan  m1 0 1 2 0.1",
+            "#D Fri Jul 14 03:00:00 2017",
+            "",
+            "#S 2  ascan  m1 0 1 2 0.1",
+            "#D Fri Jul 14 02:50:00 2017",
+            "",
+            "#S 3  ascan  m1 0 1 2 0.1",
+            "",
+            "#S 4  ascan  m1 0 1 2 0.1",
+            "#D Fri Jul 14 02:45:00 2017",
+            "",
+            ])
+        tempdir = tempfile.mkdtemp()
+        try:
+            fname = os.path.join(tempdir, 'chrono.dat')
+            with open(fname, 'w') as fp:
+                fp.write(text)
+            sdf = spec.SpecDataFile(fname, indexed=True)
+            self.assertEqual(sdf.getScanNumbersChronological(), "4 2 3 1".split())
+            self.assertEqual(sdf.getFirstScanNumber(), "4")
+            self.assertEqual(sdf.getLastScanNumber(), "1")
+            self.assertEqual(sdf.last_scan, "1")
+            for scan in sdf.scans.values():
+                self.assertFalse(scan.__interpreted__)
+
+            # changed directly
+            del sdf.scans["1"]
+            self.assertEqual(sdf.getLastScanNumber(), "3")
+        finally:
+            shutil.rmtree(tempdir, ignore_errors=True)
+
+
+class TestIndexCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.data_file = os.path.join(self.tempdir, "refresh.dat")
+        shutil.copy(
+            os.path.join(_test_path, "tests", "data", "refresh1.txt"),
+            self.data_file)
+        self.cache_dir = os.path.join(self.tempdir, "cache")
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir, ignore_errors=True)
+
+    def open_spy(self, **kws):
+        """open the data file, report the start of any index_file() calls"""
+        starts = []
+        index_file = spec.SpecDataFile.index_file
+        def spy(sdf, start=0):
+            starts.append(start)
+            return index_file(sdf, start=start)
+        spec.SpecDataFile.index_file = spy
+        try:
+            sdf = spec.SpecDataFile(self.data_file, **kws)
+        finally:
+            spec.SpecDataFile.index_file = index_file
+        return sdf, starts
+
+    def test_cache_reused(self):
+        sdf, starts = self.open_spy(index_cache=self.cache_dir)
+        self.assertEqual(starts, [0])
+        cache_file = sdf.index_cache.cache_file
+        self.assertTrue(os.path.exists(cache_file))
+        self.assertTrue(cache_file.startswith(self.cache_dir))
+
+        again, starts = self.open_spy(index_cache=self.cache_dir)
+        self.assertEqual(starts, [])        # not indexed again
+        self.assertEqual(again._blocks_, sdf._blocks_)
+        self.assertEqual(again.getScanNumbers(), sdf.getScanNumbers())
+        self.assertEqual(again.getScan(3).raw, sdf.getScan(3).raw)
+
+    def test_cache_next_to_data_file(self):
+        sdf = spec.SpecDataFile(self.data_file, index_cache=True)
+        self.assertEqual(
+            sdf.index_cache.cache_file,
+            os.path.join(self.tempdir, ".refresh.dat" + spec.INDEX_CACHE_SUFFIX))
+        self.assertTrue(os.path.exists(sdf.index_cache.cache_file))
+
+    def test_cache_corrupt(self):
+        sdf = spec.SpecDataFile(self.data_file, index_cache=True)
+        with open(sdf.index_cache.cache_file, "w") as fp:
+            fp.write("{not JSON")
+        again, starts = self.open_spy(index_cache=True)
+        self.assertEqual(starts, [0])
+        self.assertEqual(again.getScanNumbers(), ["1", "2", "3"])
+        self.assertIsNotNone(again.index_cache.load())
+
+    def test_cache_stale(self):
+        sdf = spec.SpecDataFile(self.data_file, index_cache=True)
+        tail = sdf._blocks_[-1]
+
+        # file grows: index only from the last block
+        with open(os.path.join(_test_path, "tests", "data", "refresh2.txt"), "r") as fp:
+            text = fp.read()
+        with open(self.data_file, "a") as fp:
+            fp.write(text)
+        again, starts = self.open_spy(index_cache=True)
+        self.assertEqual(starts, [tail.offset])
+        self.assertEqual(again.getScanNumbers(), ["1", "2", "3", "4", "5"])
+        self.assertEqual(again._blocks_, spec.SpecDataFile(self.data_file).index_file())
+
+        # file replaced: index it all
+        shutil.copy(
+            os.path.join(_test_path, "tests", "data", "refresh3.txt"),
+            self.data_file)
+        again, starts = self.open_spy(index_cache=True)
+        self.assertEqual(starts, [0])
+        self.assertEqual(again.getScanNumbers(), ["6"])
+
+    def test_cache_not_written(self):
+        replace_file = spec._replace_file_
+        def fails(source, target):
+            raise AttributeError("no os.replace")
+        spec._replace_file_ = fails
+        try:
+            sdf = spec.SpecDataFile(self.data_file, index_cache=True)
+        finally:
+            spec._replace_file_ = replace_file
+        self.assertEqual(sdf.getScanNumbers(), ["1", "2", "3"])
+        self.assertFalse(os.path.exists(sdf.index_cache.cache_file))
+        self.assertFalse(os.path.exists(sdf.index_cache.cache_file + ".tmp"))
+
+        # replaces an existing copy
+        sdf.index_cache.write(sdf._blocks_)
+        sdf.index_cache.write(sdf._blocks_)
+        self.assertIsNotNone(sdf.index_cache.load())
+
 
 def suite(*args, **kw):
     test_suite = unittest.TestSuite()
     test_list = [
         Test,
         TestFileUpdate,
+        TestIndexedFile,
+        TestIndexCache,
         ]
     for test_case in test_list:
         test_suite.addTest(unittest.makeSuite(test_case))
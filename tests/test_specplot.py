@@ -69,6 +69,21 @@ class Issue_66_plotting_problems(unittest.TestCase):
              
         self.assertFalse(os.path.exists(self.plotFile))
              
+    def test_scan_aborted_projection(self):
+        specFile = self.abs_data_fname('33bm_spec.dat')
+        scan_number = 15
+     
+        sfile = specplot.openSpecFile(
+            specFile, projection=specplot.PLOT_PROJECTION)
+        scan = sfile.getScan(scan_number)
+        self.assertEqual(scan.data, {})
+        self.assertFalse(scan.__interpreted__)      # only the projection
+        self.assertTrue(hasattr(scan, specplot.ABORTED_ATTRIBUTE_TEXT))
+        self.assertEqual(
+            getattr(scan, specplot.ABORTED_ATTRIBUTE_TEXT), 
+            'Scan aborted after 0 points.')
+        self.assertFalse(scan.__interpreted__)
+         
     def test_y_values_all_zero_lin_lin(self):
         specFile = os.path.join(os.path.dirname(__file__), 'data', 'issue64_data.txt')
         scan_number = 50
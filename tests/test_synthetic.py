@@ -0,0 +1,122 @@
+'''
+unit tests for the synthetic and benchmark modules
+'''
+
+#-----------------------------------------------------------------------------
+# :author:    Pete R. Jemian
+# :email:     prjemian@gmail.com
+# :copyright: (c) 2014-2019, Pete R. Jemian
+#
+# Distributed under the terms of the Creative Commons Attribution 4.0 International Public License.
+#
+# The full license is in the file LICENSE.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+_test_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+_path = os.path.abspath(os.path.join(_test_path, 'src'))
+
+sys.path.insert(0, _path)
+sys.path.insert(0, _test_path)
+
+from spec2nexus import benchmark, spec, synthetic
+
+
+class TestSynthetic(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir, ignore_errors=True)
+
+    def test_make_spec_file(self):
+        fname = os.path.join(self.tempdir, "synthetic.dat")
+        info = synthetic.make_spec_file(
+            fname, scans=6, rows=20, columns=6, mca_channels=40,
+            positioners=20, unicat=10, uxml=True, mesh_every=3)
+        self.assertEqual(info["bytes"], os.path.getsize(fname))
+        self.assertEqual(info["rows"], 4 * 20 + 2 * 16)
+        self.assertTrue(spec.is_spec_file_with_header(fname))
+
+        sdf = spec.SpecDataFile(fname)
+        self.assertEqual(sdf.getScanNumbers(), list("123456"))
+        scan = sdf.getScan(1)
+        self.assertEqual(scan.L, info["labels"])
+        self.assertEqual(len(scan.data["I0"]), 20)
+        self.assertEqual(len(scan.positioner), 20)
+        self.assertEqual(len(scan.metadata), 10)
+        self.assertEqual(scan.data["_mca_"]["mca"].shape, (20, 40))
+        self.assertEqual(scan.UXML_root.tag, "UXML")
+        self.assertEqual(len(scan.get_interpreter_comments()), 0)
+
+        scan = sdf.getScan(3)
+        self.assertTrue(scan.scanCmd.startswith("mesh "))
+        self.assertEqual(scan.L[:2], ["mot000", "mot001"])
+        self.assertEqual(len(scan.data["mot001"]), 16)
+
+        # same parameters, same file
+        again = os.path.join(self.tempdir, "again.dat")
+        synthetic.make_spec_file(
+            again, scans=6, rows=20, columns=6, mca_channels=40,
+            positioners=20, unicat=10, uxml=True, mesh_every=3)
+        with open(fname) as fp:
+            content = fp.read()
+        with open(again) as fp:
+            self.assertEqual(
+                fp.read(), content.replace("synthetic.dat", "again.dat"))
+
+    def test_benchmark(self):
+        results = os.path.join(self.tempdir, "results.jsonl")
+        records = benchmark.run_benchmarks(
+            workloads=["basic"],
+            tasks=["open", "interpret"],
+            scale=0.01,
+            workdir=os.path.join(self.tempdir, "work"),
+            results=results)
+        self.assertEqual(len(records), 2)
+        for record in records:
+            self.assertIsNone(record["error"])
+            self.assertGreater(record["seconds"], 0)
+            self.assertEqual(record["scans"], 2)
+            self.assertEqual(record["rows"], 400)
+        with open(results) as fp:
+            self.assertEqual(
+                [json.loads(line)["task"] for line in fp],
+                ["open", "interpret"])
+        text = benchmark.report(results)
+        self.assertIn("basic  interpret", text)
+        for record in records:
+            self.assertEqual(record["memory_method"], benchmark._memory_method_())
+            self.assertIsNotNone(record["peak_MB"])
+
+    def test_benchmark_memory(self):
+        fname = os.path.join(self.tempdir, "synthetic.dat")
+        synthetic.make_spec_file(fname, scans=2, rows=20)
+        inherited = bytearray(100 * 2**20)  # in use before the task starts
+        seconds, peak, error = benchmark._run_task_(
+            "open", fname, self.tempdir, memory=True)
+        self.assertIsNone(error)
+        self.assertGreaterEqual(peak, 0)
+        self.assertLess(peak, len(inherited) / 2)   # not counted
+
+
+def suite(*args, **kw):
+    test_suite = unittest.TestSuite()
+    test_list = [
+        TestSynthetic,
+        ]
+    for test_case in test_list:
+        test_suite.addTest(unittest.makeSuite(test_case))
+    return test_suite
+
+
+if __name__ == "__main__":
+    runner=unittest.TextTestRunner()
+    runner.run(suite())
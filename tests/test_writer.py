@@ -25,7 +25,7 @@ _path = os.path.abspath(os.path.join(_test_path, 'src'))
 sys.path.insert(0, _path)
 sys.path.insert(0, _test_path)
 
-from spec2nexus import spec, writer
+from spec2nexus import spec, synthetic, writer
 
 import tests.common
 
@@ -76,6 +76,183 @@ class TestWriter(unittest.TestCase):
             self.assertTrue(signal in nxdata)
 
 
+class TestStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.fname = os.path.join(self.tempdir, "synthetic.dat")
+        synthetic.make_spec_file(
+            self.fname, scans=2, rows=100, mca_channels=128, mesh_every=2)
+        self.hname = os.path.join(self.tempdir, "synthetic.hdf5")
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir, ignore_errors=True)
+
+    def test_compression(self):
+        spec_data = spec.SpecDataFile(self.fname)
+        out = writer.Writer(spec_data, compression="gzip", shuffle=True)
+        out.save(self.hname, [1, 2])
+
+        with h5py.File(self.hname, "r") as hp:
+            ds = hp["/S1/data/_mca_"]
+            self.assertEqual(ds.shape, (100, 128))
+            self.assertEqual(ds.chunks, (100, 128))
+            self.assertEqual(ds.compression, "gzip")
+            self.assertTrue(ds.shuffle)
+            ref = spec_data.getScan(1).data["_mca_"]["mca"]
+            self.assertEqual(ds[()].tolist(), ref.tolist())
+
+            ds = hp["/S2/data/_mca_"]      # mesh scan
+            self.assertEqual(ds.shape, (10, 10, 128))
+            self.assertEqual(ds.chunks, (10, 10, 128))
+            self.assertEqual(ds.compression, "gzip")
+
+        out = writer.Writer(spec_data)
+        out.save(self.hname, [1])
+        with h5py.File(self.hname, "r") as hp:
+            self.assertIsNone(hp["/S1/data/_mca_"].chunks)
+
+        self.assertRaises(ValueError, writer.Writer, spec_data, compression="bz2")
+
+
+class TestUpdate(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.fname = os.path.join(self.tempdir, "synthetic.dat")
+        self.hname = os.path.join(self.tempdir, "synthetic.hdf5")
+        synthetic.make_spec_file(self.fname, scans=5, rows=20)
+        with open(self.fname) as fp:
+            self.content = fp.read()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir, ignore_errors=True)
+
+    def grow(self, scans, rows=0):
+        """write the first scans and the first rows of the next scan"""
+        text = self.content.split("\n#S %d " % (scans + 1))[0]
+        if rows > 0:
+            lines = self.content.split("\n#S %d " % (scans + 1))[1].splitlines()
+            end = lines.index([l for l in lines if l.startswith("#L ")][0]) + 1
+            text += "\n#S %d " % (scans + 1) + "\n".join(lines[:end + rows]) + "\n"
+        with open(self.fname, "w") as fp:
+            fp.write(text)
+
+    def test_update(self):
+        self.grow(2, rows=5)
+        spec_data = spec.SpecDataFile(self.fname)
+        writer.Writer(spec_data).save(self.hname, spec_data.getScanNumbers())
+        with h5py.File(self.hname, "r") as hp:
+            self.assertEqual(sorted(hp.keys()), ["S1", "S2", "S3"])
+            self.assertEqual(hp["/S3/data/I0"].shape, (5,))
+            self.assertTrue("SPEC_scan_bytes" in hp["S3"].attrs)
+
+        # nothing new
+        spec_data = spec.SpecDataFile(self.fname)
+        written = writer.Writer(spec_data).update(self.hname, spec_data.getScanNumbers())
+        self.assertEqual(written, [])
+
+        # the last scan grows, a new scan starts
+        self.grow(3, rows=7)
+        spec_data = spec.SpecDataFile(self.fname)
+        written = writer.Writer(spec_data).update(self.hname, spec_data.getScanNumbers())
+        self.assertEqual(written, ["3", "4"])
+        with h5py.File(self.hname, "r") as hp:
+            self.assertEqual(sorted(hp.keys()), ["S1", "S2", "S3", "S4"])
+            self.assertEqual(hp["/S3/data/I0"].shape, (20,))
+            self.assertEqual(hp["/S4/data/I0"].shape, (7,))
+            self.assertEqual(hp.attrs["default"], "S1")
+
+        # file written before the scan extent was recorded
+        with h5py.File(self.hname, "a") as hp:
+            for key in ("S3", "S4"):
+                del hp[key].attrs["SPEC_scan_bytes"]
+        written = writer.Writer(spec_data).update(self.hname, spec_data.getScanNumbers())
+        self.assertEqual(written, ["4"])
+
+        # new output file
+        os.remove(self.hname)
+        written = writer.Writer(spec_data).update(self.hname, ["1", "2"])
+        self.assertEqual(written, ["1", "2"])
+        self.assertTrue(os.path.exists(self.hname))
+
+    def test_update_file_size(self):
+        # space of the entries written again is re-used
+        spec_data = spec.SpecDataFile(self.fname)
+        writer.Writer(spec_data).save(self.hname, spec_data.getScanNumbers())
+        size = os.path.getsize(self.hname)
+        for _i in range(20):
+            with h5py.File(self.hname, "a") as hp:
+                for key in ("S2", "S4"):    # as if these scans changed
+                    hp[key].attrs["SPEC_scan_bytes"] = -1
+            written = writer.Writer(spec_data).update(
+                self.hname, spec_data.getScanNumbers())
+            self.assertEqual(written, ["2", "4"])
+        self.assertLess(os.path.getsize(self.hname), 1.5 * size)
+
+
+class TestStreamWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.fname = os.path.join(self.tempdir, "synthetic.dat")
+        self.hname = os.path.join(self.tempdir, "synthetic.hdf5")
+        synthetic.make_spec_file(
+            os.path.join(self.tempdir, "complete.dat"),
+            scans=3, rows=20, mca_channels=32, mesh_every=3)
+        with open(os.path.join(self.tempdir, "complete.dat")) as fp:
+            self.lines = fp.readlines()
+        self.mtime = os.path.getmtime(os.path.join(self.tempdir, "complete.dat"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir, ignore_errors=True)
+
+    def grow(self, number):
+        """write the first lines of the file, as SPEC does"""
+        with open(self.fname, "w") as fp:
+            fp.write("".join(self.lines[:number]))
+        self.mtime += 1
+        os.utime(self.fname, (self.mtime, self.mtime))
+
+    def test_stream(self):
+        first = [i for i, line in enumerate(self.lines) if line.startswith("#S 2 ")][0]
+        lines = first + 30      # including a few data rows of scan 2
+        self.grow(lines)
+        spec_data = spec.SpecDataFile(self.fname)
+        live = writer.StreamWriter(spec_data, self.hname)
+        live.open()
+        self.assertTrue(live.root.swmr_mode)
+        self.assertEqual(sorted(live.root.keys()), ["S1", "S2"])
+        ds = live.root["/S2/data/I0"]
+        self.assertEqual(ds.maxshape, (None,))
+        rows = ds.shape[0]
+        self.assertGreater(rows, 0)
+        self.assertEqual(live.root["/S2/data/_mca_"].maxshape, (None, 32))
+
+        self.assertFalse(live.poll())   # no change
+        while rows == ds.shape[0]:      # one line at a time
+            lines += 1
+            self.grow(lines)
+            self.assertTrue(live.poll())
+            self.assertTrue(live.root.swmr_mode)
+        self.assertEqual(ds.shape[0], rows + 1)
+        self.assertEqual(live.root["/S2/data/I0"][-1], live._live_scan_.data["I0"][-1])
+
+        # the rest of the file, scan 3 is a mesh scan
+        while lines < len(self.lines):
+            lines += 5
+            self.grow(lines)
+            live.poll()
+        self.assertEqual(sorted(live.root.keys()), ["S1", "S2", "S3"])
+        self.assertEqual(live.root["/S3/data/I0"].shape, (16,))    # 1-D while live
+        live.close()
+
+        with h5py.File(self.hname, "r") as hp:
+            self.assertEqual(hp["/S2/data/I0"].shape, (20,))
+            self.assertEqual(hp["/S2/data/_mca_"].shape, (20, 32))
+            self.assertEqual(hp["/S3/data/I0"].shape, (4, 4))    # 2-D when complete
+
+
 class TestMeshes(unittest.TestCase):
 
     def setUp(self):
@@ -187,6 +364,9 @@ def suite(*args, **kw):
     test_suite = unittest.TestSuite()
     test_list = [
         TestWriter,
+        TestStorage,
+        TestUpdate,
+        TestStreamWriter,
         TestMeshes,
         ]
     for test_case in test_list: